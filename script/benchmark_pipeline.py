@@ -0,0 +1,131 @@
+import autorootcwd
+import argparse
+import time
+
+import numpy as np
+
+from src.hand_gesture.hand_tracker import HandTracker
+from src.hand_gesture.dwell_selector import DwellSelector
+from src.streaming import open_video_source
+
+
+def summarize(name, samples_ms):
+    if not samples_ms:
+        print(f"{name:<16} no samples")
+        return
+    samples = np.asarray(samples_ms)
+    print(f"{name:<16} mean {samples.mean():7.2f} ms  p50 {np.percentile(samples, 50):7.2f} ms  "
+          f"p95 {np.percentile(samples, 95):7.2f} ms  max {samples.max():7.2f} ms")
+
+
+def run_benchmark(source, max_frames=None, inference_width=None):
+    hand_tracker = HandTracker(inference_width=inference_width)
+    dwell_selector = DwellSelector(hand_tracker)
+
+    process_ms = []
+    selection_ms = []
+    frame_latency_ms = []
+    frames = 0
+    hands = 0
+    selections = 0
+
+    start = time.monotonic()
+    while max_frames is None or frames < max_frames:
+        ret, frame = source.read()
+        if not ret:
+            break
+        frame_ready = time.monotonic()
+
+        debug_image = frame.copy()
+        t0 = time.perf_counter()
+        debug_image, _, _, landmark_list = hand_tracker.process_frame(frame, debug_image, None, None, mode='inference')
+        t1 = time.perf_counter()
+        process_ms.append((t1 - t0) * 1000.0)
+
+        if landmark_list is not None:
+            hands += 1
+            active = hand_tracker.prev_hand_gesture != "open"
+            t0 = time.perf_counter()
+            _, confirmed_tomato = dwell_selector.update(landmark_list[8], frame_ready, active)
+            selection_ms.append((time.perf_counter() - t0) * 1000.0)
+            if confirmed_tomato is not None:
+                selections += 1
+
+        frame_latency_ms.append((time.monotonic() - frame_ready) * 1000.0)
+        frames += 1
+
+    elapsed = time.monotonic() - start
+    source.release()
+
+    print(f"frames {frames}  hands {hands}  selections {selections}  "
+          f"elapsed {elapsed:.2f} s  fps {frames / elapsed if elapsed > 0 else 0.0:.1f}")
+    summarize("process_frame", process_ms)
+    summarize("dwell_selection", selection_ms)
+    summarize("frame_latency", frame_latency_ms)
+
+
+def detect_landmarks(frames, inference_width):
+    """run detection over frames with a fresh tracker; returns (per-frame landmarks or None, detect times in ms)"""
+    hand_tracker = HandTracker(inference_width=inference_width)
+    landmarks = []
+    detect_ms = []
+    for frame in frames:
+        t0 = time.perf_counter()
+        detection = hand_tracker.detect(frame, mode='inference')
+        detect_ms.append((time.perf_counter() - t0) * 1000.0)
+        landmarks.append(None if detection.landmark_list is None else np.asarray(detection.landmark_list, dtype=np.float32))
+    return landmarks, detect_ms
+
+
+def run_resolution_sweep(source, widths, max_frames=300):
+    """detection latency against landmark drift from the full-resolution result for each inference width"""
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = source.read()
+        if not ret:
+            break
+        frames.append(frame)
+    source.release()
+    if not frames:
+        print("no frames")
+        return
+
+    print(f"frames {len(frames)}  resolution {frames[0].shape[1]}x{frames[0].shape[0]}")
+    reference, _ = detect_landmarks(frames, None)
+    reference_hands = sum(landmarks is not None for landmarks in reference)
+
+    print(f"{'width':>6} {'p50 ms':>8} {'p95 ms':>8} {'hands':>7} {'drift px':>9} {'tip px':>8}")
+    for width in widths:
+        landmarks, detect_ms = detect_landmarks(frames, width)
+        drift = []
+        tip_drift = []
+        for ref, points in zip(reference, landmarks):
+            if ref is None or points is None:
+                continue
+            distances = np.linalg.norm(points - ref, axis=1)
+            drift.append(distances.mean())
+            tip_drift.append(distances[8])
+        hands = sum(points is not None for points in landmarks)
+        print(f"{width or 'full':>6} {np.percentile(detect_ms, 50):8.2f} {np.percentile(detect_ms, 95):8.2f} "
+              f"{hands:>3}/{reference_hands:<3} {np.mean(drift) if drift else float('nan'):9.2f} "
+              f"{np.mean(tip_drift) if tip_drift else float('nan'):8.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark hand tracking and dwell selection on a recorded session")
+    parser.add_argument('source', help="camera index, video file or image directory")
+    parser.add_argument('--realtime', action='store_true', help="replay at the recorded timing instead of as fast as possible")
+    parser.add_argument('--loop', action='store_true', help="restart the recording when it ends (use with --max-frames)")
+    parser.add_argument('--fps', type=float, default=30.0, help="frame rate for image directories")
+    parser.add_argument('--max-frames', type=int, default=None)
+    parser.add_argument('--inference-width', type=int, default=None, help="downscale frames to this width for MediaPipe")
+    parser.add_argument('--sweep-widths', default=None,
+                        help="comma separated inference widths (0 for full) to compare against full resolution, e.g. 640,480,320,256")
+    args = parser.parse_args()
+
+    source = open_video_source(args.source, realtime=args.realtime, loop=args.loop, fps=args.fps)
+    if args.sweep_widths:
+        widths = [int(width) or None for width in args.sweep_widths.split(",")]
+        run_resolution_sweep(source, widths, args.max_frames or 300)
+    else:
+        run_benchmark(source, args.max_frames, args.inference_width)
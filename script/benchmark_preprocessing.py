@@ -0,0 +1,99 @@
+import autorootcwd
+import argparse
+import copy
+import itertools
+import timeit
+from collections import deque
+
+import numpy as np
+
+from src.hand_gesture.point_history import PointHistory
+from src.hand_gesture.utils.preprocessing import pre_process_landmark, pre_process_point_history
+
+
+def legacy_pre_process_landmark(landmark_list):
+    """the list-based implementation the NumPy version replaced, kept as the baseline"""
+    temp_landmark_list = copy.deepcopy(landmark_list)
+
+    base_x, base_y = 0, 0
+    for index, landmark_point in enumerate(temp_landmark_list):
+        if index == 0:
+            base_x, base_y = landmark_point[0], landmark_point[1]
+
+        temp_landmark_list[index][0] = temp_landmark_list[index][0] - base_x
+        temp_landmark_list[index][1] = temp_landmark_list[index][1] - base_y
+
+    temp_landmark_list = list(itertools.chain.from_iterable(temp_landmark_list))
+    max_value = max(list(map(abs, temp_landmark_list)))
+
+    def normalize_(n):
+        return n / max_value
+
+    return list(map(normalize_, temp_landmark_list))
+
+
+def legacy_pre_process_point_history(image, point_history):
+    """the list-based implementation the NumPy version replaced, kept as the baseline"""
+    image_width, image_height = image.shape[1], image.shape[0]
+
+    temp_point_history = copy.deepcopy(point_history)
+
+    base_x, base_y = 0, 0
+    for index, point in enumerate(temp_point_history):
+        if index == 0:
+            base_x, base_y = point[0], point[1]
+
+        temp_point_history[index][0] = (temp_point_history[index][0] - base_x) / image_width
+        temp_point_history[index][1] = (temp_point_history[index][1] - base_y) / image_height
+
+    return list(itertools.chain.from_iterable(temp_point_history))
+
+
+def report(name, legacy, current, number):
+    legacy_us = min(timeit.repeat(legacy, number=number, repeat=5)) / number * 1e6
+    current_us = min(timeit.repeat(current, number=number, repeat=5)) / number * 1e6
+    print(f"{name:<16} legacy {legacy_us:7.2f} us  numpy {current_us:7.2f} us  speedup {legacy_us / current_us:5.1f}x")
+
+
+def run_benchmark(number, width, height, history_length):
+    rng = np.random.default_rng(0)
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+
+    landmark_array = (rng.random((21, 2)) * (width, height)).astype(np.int32)
+    landmark_list = landmark_array.tolist()
+    point_history = deque(((rng.random((history_length, 2)) * (width, height)).astype(np.int32)).tolist(),
+                          maxlen=history_length)
+    # HandTracker keeps the history in a ring buffer and preprocesses its ordered view
+    ring_history = PointHistory(history_length)
+    for point in point_history:
+        ring_history.append(point)
+
+    landmark_input = np.zeros((1, 21 * 2), dtype=np.float32)
+    point_history_input = np.zeros((1, history_length * 2), dtype=np.float32)
+
+    # both implementations have to agree before their timings mean anything
+    np.testing.assert_allclose(pre_process_landmark(landmark_array, out=landmark_input),
+                               legacy_pre_process_landmark(landmark_list), rtol=1e-6)
+    np.testing.assert_allclose(pre_process_point_history(image, ring_history.points(), out=point_history_input),
+                               legacy_pre_process_point_history(image, point_history), rtol=1e-6, atol=1e-7)
+
+    print(f"{number} calls, {width}x{height}, history {history_length}")
+    report("landmark",
+           lambda: legacy_pre_process_landmark(landmark_list),
+           lambda: pre_process_landmark(landmark_array, out=landmark_input),
+           number)
+    report("point_history",
+           lambda: legacy_pre_process_point_history(image, point_history),
+           lambda: pre_process_point_history(image, ring_history.points(), out=point_history_input),
+           number)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the NumPy landmark / point history preprocessing against the list-based baseline")
+    parser.add_argument('--number', type=int, default=20000, help="calls per timing run")
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--history-length', type=int, default=16)
+    args = parser.parse_args()
+
+    run_benchmark(args.number, args.width, args.height, args.history_length)
@@ -1,20 +1,91 @@
 import autorootcwd
 import cv2
-import base64
 import numpy as np
 import threading
 import time
-from flask import Flask, render_template
+from flask import Flask, Response, render_template, request, jsonify
 from flask_socketio import SocketIO, emit
 
-from src.hand_gesture.hand_tracker import HandTracker
+from src.hand_gesture.dwell_selector import DwellSelector
+from src.hand_gesture.utils import CvFpsCalc
 from src.indy_robot.robot_sequence_controller import RobotSequenceController
+from src.indy_robot.robot_job_queue import RobotJobQueue, JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED
+from src.streaming import LatestFrameGrabber, FrameBroadcaster, FrameScheduler, StaticFrameEmitter, ViewTransform, open_video_source, monotonic_to_epoch_ms
+from src.streaming import mjpeg_stream, MJPEG_MIMETYPE, Pipeline, PIPELINE_END, EventCoalescer, MetricsRegistry, GlassToGlassTracker, MotionGate
 
 app = Flask(__name__)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
-hand_tracker = HandTracker()
-robot_controller = RobotSequenceController()
+# MediaPipe worker processes (0 runs inference in this process); the live stream always uses the
+# first one, a second one takes the idle presence probes
+INFERENCE_WORKERS = 0
+# 'solutions' (blocking Hands.process) or 'tasks' (asynchronous HandLandmarker in LIVE_STREAM mode,
+# needs the hand_landmarker.task model from the MediaPipe model zoo at LANDMARKER_MODEL;
+# KEYFRAME_INTERVAL and HAND_ROI are ignored with 'tasks', its results lag a frame behind)
+LANDMARK_BACKEND = 'solutions'
+LANDMARKER_MODEL = 'src/hand_gesture/model/hand_landmarker/hand_landmarker.task'
+
+# per-stage latency histograms and counters, served on /metrics
+metrics = MetricsRegistry()
+
+# run MediaPipe on at most every Nth frame, optical flow carries the landmarks in between
+# (the cadence drops to every frame while the hand moves fast)
+KEYFRAME_INTERVAL = 3
+# width of the frame MediaPipe sees (None for full resolution); display and overlays stay full-res,
+# see script/benchmark_pipeline.py --sweep-widths for the latency / landmark drift trade-off
+INFERENCE_WIDTH = 480
+# landmark only a crop around the previous hand (full-frame search when it is lost)
+HAND_ROI = True
+
+# created by setup(): with INFERENCE_WORKERS > 0 every spawned landmark worker re-imports this
+# script, and it must not load the classifiers, MediaPipe or the robot job queue again there
+hand_tracker = None
+dwell_selector = None
+robot_controller = None
+robot_jobs = None
+frame_broadcaster = FrameBroadcaster(socketio, metrics=metrics)
+static_emitter = StaticFrameEmitter(frame_broadcaster, keepalive_interval=1.0)
+# state events go out on change only; selection_time progress at most 10 times a second
+state_events = EventCoalescer(socketio, progress_interval=0.1)
+# camera-to-screen latency per client, from render acks and clock pings
+glass_to_glass = GlassToGlassTracker(metrics=metrics)
+
+# camera index, video file or image directory (see src/streaming/video_source.py)
+VIDEO_SOURCE = 0
+# optional lens calibration (camera_matrix, dist_coeffs, image_size), undistortion is skipped without it
+CAMERA_CALIBRATION_FILE = 'src/hand_gesture/data/camera_calibration.json'
+
+view_transform = ViewTransform.from_file(CAMERA_CALIBRATION_FILE)
+
+# inference stage rate; while it overruns every other frame skips inference, and the
+# annotate stage skips the overlay on the frame after it overran the same budget itself
+TARGET_FPS = 30.0
+frame_scheduler = FrameScheduler(TARGET_FPS)
+fps_calc = CvFpsCalc(buffer_len=10)
+processing_fps = 0.0
+# newest inference result; frames that skip inference redraw it so the overlay does not flicker
+last_detection = None
+
+# how often the hand detector probes for a returning hand while the stream is paused
+PAUSED_PROBE_INTERVAL = 0.2
+# idle mode (stream paused): a cheap motion check every IDLE_PROBE_INTERVAL, and hand
+# detection on a frame downscaled by IDLE_PROBE_SCALE only when something moved
+IDLE_PROBE_INTERVAL = 0.25
+IDLE_PROBE_SCALE = 0.5
+motion_gate = MotionGate()
+# while the robot runs: plain camera frames at a reduced rate and size with a progress bar, no inference
+EXECUTING_FPS = 10.0
+EXECUTING_SCALE = 0.5
+last_executing_frame = 0.0
+
+metrics.gauge('processing_fps', lambda: processing_fps)
+metrics.gauge('stream_clients', lambda: len(frame_broadcaster.clients))
+metrics.gauge('mjpeg_viewers', lambda: frame_broadcaster.encoder.viewers)
+metrics.gauge('deadline_misses', lambda: frame_scheduler.deadline_misses)
+metrics.gauge('landmark_keyframes', lambda: hand_tracker.landmark_flow.keyframes if hand_tracker.landmark_flow else None)
+metrics.gauge('landmark_propagated', lambda: hand_tracker.landmark_flow.propagated if hand_tracker.landmark_flow else None)
+metrics.gauge('hand_roi_crops', lambda: hand_tracker.hand_roi.crops if hand_tracker.hand_roi else None)
+metrics.gauge('hand_roi_fallbacks', lambda: hand_tracker.hand_roi.fallbacks if hand_tracker.hand_roi else None)
 
 zoom_scale = 1.0
 MIN_ZOOM = 1.0
@@ -22,6 +93,9 @@ MAX_ZOOM = 3.0
 ZOOM_STEP = 0.1
 
 thread_running = False
+video_thread_lock = threading.Lock()
+video_pipeline = None
+stream_paused = False
 frame = None
 robot_ready = False
 robot_executing = False
@@ -30,21 +104,33 @@ completion_message_start = None
 showing_completion = False
 mode = 'inference'
 current_point_coord = None
+state_changed = threading.Condition()
+
+def notify_state_change():
+    with state_changed:
+        state_changed.notify_all()
+
+def wait_for_state_change(timeout):
+    """sleep until another thread changes the app state or timeout passes"""
+    with state_changed:
+        state_changed.wait(timeout)
 
 @socketio.on('key_press')
 def handle_key_press(data):
-    global mode, current_point_coord, zoom_scale
+    global mode, zoom_scale
     key = data.get('key')
     
     if key == 'l':
         mode = 'logging'
         print("Changed to logging mode")
-        socketio.emit('mode_change', {'mode': 'logging'})
+        state_events.update('mode_change', {'mode': 'logging'})
+        notify_state_change()
     elif key == 'Escape':
         mode = 'inference'
         hand_tracker.current_tomato_id = None
         print("Changed to inference mode")
-        socketio.emit('mode_change', {'mode': 'inference'})
+        state_events.update('mode_change', {'mode': 'inference'})
+        notify_state_change()
     elif key == '+' or key == '=':
         print("Zoom in")
         zoom_scale = min(zoom_scale + ZOOM_STEP, MAX_ZOOM)
@@ -56,20 +142,214 @@ def handle_key_press(data):
     elif key in ['1', '2', '3', '4'] and mode == 'logging' and current_point_coord is not None:
         tomato_id = int(key)
 
-        hand_tracker.save_tomato_coordinate(tomato_id, current_point_coord, zoom_scale)
+        camera_coords = view_transform.display_to_camera(current_point_coord, (frame.shape[1], frame.shape[0]), zoom_scale)
+        hand_tracker.save_tomato_coordinate(tomato_id, current_point_coord, zoom_scale, camera_coords)
         print(f"Saved coordinates for tomato #{tomato_id}: {current_point_coord} (zoom: {zoom_scale:.1f}x)")
         socketio.emit('coordinate_saved', {'tomato_id': tomato_id, 'zoom_scale': zoom_scale})
 
+class FrameJob:
+    """a frame travelling through the processing pipeline"""
+    def __init__(self, grabbed, frame):
+        self.grabbed = grabbed
+        self.frame = frame
+        self.detection = None
+        # what annotate_stage draws: this frame's detection, or the last one on a skipped frame
+        self.draw_detection = None
+        self.selected_tomato = None
+        self.debug_image = None
+
+def emit_frame(image, grabbed):
+    if not frame_broadcaster.has_clients():
+        return
+    frame_broadcaster.broadcast(image, grabbed.seq, monotonic_to_epoch_ms(grabbed.timestamp))
+
+def show_static_frame(state, image, grabbed):
+    static_emitter.show(state, image, grabbed.seq, monotonic_to_epoch_ms(grabbed.timestamp))
+
+def inference_stage(grabbed):
+    """zoom/undistort, hand inference and the selection state machine; returns a FrameJob to draw or None"""
+    global frame, robot_ready, robot_executing, last_hand_detection_time, completion_message_start, showing_completion
+    global current_point_coord, stream_paused, last_detection
+
+    if stream_paused and not showing_completion and not robot_executing:
+        return idle_probe(grabbed)
+    if robot_executing and not showing_completion:
+        return executing_frame(grabbed)
+
+    # Apply lens undistortion and zoom to the frame (one cached remap)
+    with metrics.time('zoom'):
+        frame = view_transform.apply(grabbed.image, zoom_scale)
+    # saved tomatoes are kept in camera pixels and follow the current zoom / undistortion
+    hand_tracker.set_view(view_transform, zoom_scale, (frame.shape[1], frame.shape[0]))
+    current_time = time.time()
+
+    if showing_completion:
+        remaining = 3.0 - (current_time - completion_message_start)
+        if remaining >= 0:
+            # the completion message is static: send one frozen frame, then only keep-alives
+            show_static_frame('completion', frame, grabbed)
+            wait_for_state_change(min(static_emitter.time_until_keepalive(), remaining))
+            return None
+        else:
+            showing_completion = False
+            completion_message_start = None
+            dwell_selector.clear_selection()
+            robot_executing = False
+            static_emitter.clear()
+
+    # paced frames start here: the static completion frame above is not part of the frame budget
+    frame_scheduler.begin_frame()
+    metrics.inc('frames_processed')
+
+    job = FrameJob(grabbed, frame)
+    if frame_scheduler.should_run_inference():
+        job.detection = hand_tracker.detect(frame, mode='inference')
+        last_detection = job.detection
+    # drawing only: the dwell selector and the pause timer below still see skipped frames as None
+    job.draw_detection = last_detection
+    landmark_list = job.detection.landmark_list if job.detection is not None else None
+
+    if landmark_list is not None:
+        metrics.inc('hands_detected')
+        current_point_coord = landmark_list[8]
+        last_hand_detection_time = current_time
+        robot_ready = True
+        if stream_paused:
+            print("Hand detected, resuming stream")
+            stream_paused = False
+            static_emitter.clear()
+            state_events.update('segment_status', {'detected': True, 'resumed': True})
+
+        active = mode == 'inference' and hand_tracker.prev_hand_gesture != "open"
+        match_result, confirmed_tomato = dwell_selector.update(landmark_list[8], current_time, active)
+
+        if confirmed_tomato is not None:
+            print(f"Selected tomato: {confirmed_tomato}")
+            dispatch_pick(confirmed_tomato)
+        if match_result is not None:
+            state_events.update('tomato_match_result', match_result)
+
+    elif job.detection is not None and current_time - last_hand_detection_time > 5.0 and not showing_completion:
+        if not stream_paused:
+            print("No hand detected for 5 seconds, pausing stream")
+            state_events.update('segment_status', {'detected': False, 'timeout': True})
+            state_events.update('tomato_match_result', {'matched_id': None})
+            stream_paused = True
+            last_detection = None
+            motion_gate.reset()
+        if static_emitter.state != 'paused':
+            show_static_frame('paused', hand_tracker.draw(frame.copy(), job.detection), grabbed)
+        else:
+            static_emitter.keepalive()
+        # close the frame before idling, so the wait does not count as an overrun
+        frame_scheduler.end_frame()
+        wait_for_state_change(min(PAUSED_PROBE_INTERVAL, static_emitter.time_until_keepalive()))
+        return None
+
+    job.selected_tomato = dwell_selector.selected_tomato
+    frame_scheduler.end_frame()
+    return job
+
+def idle_probe(grabbed):
+    """paused stream: motion gate on a thumbnail, then a hand check on a downscaled frame"""
+    global stream_paused, last_hand_detection_time
+
+    metrics.inc('idle_probes')
+    # probe what the stream shows: motion or a hand outside the zoomed view must not wake it
+    view = view_transform.apply(grabbed.image, zoom_scale)
+    if motion_gate.update(view):
+        metrics.inc('idle_hand_checks')
+        small = cv2.resize(view, None, fx=IDLE_PROBE_SCALE, fy=IDLE_PROBE_SCALE, interpolation=cv2.INTER_AREA)
+        if hand_tracker.has_hand(small):
+            print("Hand detected, resuming stream")
+            stream_paused = False
+            last_hand_detection_time = time.time()
+            static_emitter.clear()
+            state_events.update('segment_status', {'detected': True, 'resumed': True})
+            # the next frame runs full-rate tracking
+            return None
+
+    static_emitter.keepalive()
+    wait_for_state_change(min(IDLE_PROBE_INTERVAL, static_emitter.time_until_keepalive()))
+    return None
+
+def draw_robot_progress(image, robot_job):
+    height, width = image.shape[:2]
+    text = "Robot running"
+    progress = 0.0
+    if robot_job is not None:
+        text = f"Picking tomato {robot_job.sequence_number}"
+        if robot_job.total_steps:
+            progress = robot_job.step / robot_job.total_steps
+            text += f"  {robot_job.step}/{robot_job.total_steps} {robot_job.command}"
+    cv2.rectangle(image, (0, height - 28), (width, height), (0, 0, 0), -1)
+    cv2.rectangle(image, (0, height - 4), (int(width * progress), height), (0, 255, 0), -1)
+    cv2.putText(image, text, (8, height - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1, cv2.LINE_AA)
+    return image
+
+def executing_frame(grabbed):
+    """robot running: send a small frame with the job progress at EXECUTING_FPS, no hand inference"""
+    global frame, last_executing_frame
+
+    now = time.monotonic()
+    wait = last_executing_frame + 1.0 / EXECUTING_FPS - now
+    if wait > 0 or not frame_broadcaster.has_clients():
+        # the frames in between are dropped by the pipeline while this stage sleeps
+        wait_for_state_change(wait if wait > 0 else 1.0 / EXECUTING_FPS)
+        return None
+    last_executing_frame = now
+
+    frame = view_transform.apply(grabbed.image, zoom_scale)
+    small = cv2.resize(frame, None, fx=EXECUTING_SCALE, fy=EXECUTING_SCALE, interpolation=cv2.INTER_AREA)
+    emit_frame(draw_robot_progress(small, robot_jobs.current), grabbed)
+    metrics.inc('executing_frames')
+    return None
+
+def annotate_stage(job):
+    """draw hand and selection overlays on a copy of the frame"""
+    global processing_fps
+    started = time.monotonic()
+    processing_fps = fps_calc.get()
+    debug_image = job.frame.copy()
+
+    if frame_scheduler.should_draw():
+        with metrics.time('draw'):
+            if job.draw_detection is not None:
+                debug_image = hand_tracker.draw(debug_image, job.draw_detection)
+            else:
+                debug_image = hand_tracker.draw_tomato_centers(debug_image)
+
+    if job.selected_tomato is not None:
+        center = hand_tracker.tomato_center(job.selected_tomato)
+        if center:
+            cv2.circle(debug_image, center, 8, (0, 255, 0), -1)
+            cv2.circle(debug_image, center, 12, (0, 255, 0), 2)
+
+    job.debug_image = debug_image
+    frame_scheduler.end_draw(time.monotonic() - started)
+    return job
+
+def encode_stage(job):
+    """JPEG-encode (on the encoder pool) and send the annotated frame"""
+    emit_frame(job.debug_image, job.grabbed)
+    return None
+
+def grabber_source(grabber):
+    def read():
+        grabbed = grabber.read(timeout=0.5)
+        if grabbed is None and (grabber.failed or not grabber.running):
+            print("[Error] failed to read frame")
+            return PIPELINE_END
+        return grabbed
+    return read
+
 def process_video():
-    global thread_running, frame, robot_ready, robot_executing, last_hand_detection_time, completion_message_start, showing_completion
-    global mode, current_point_coord, zoom_scale
-    
-    cap = cv2.VideoCapture(0)
+    global thread_running, stream_paused, video_pipeline, zoom_scale
+
+    grabber = LatestFrameGrabber(open_video_source(VIDEO_SOURCE), metrics=metrics).start()
     thread_running = True
     stream_paused = False
-    last_nearest_tomato = None
-    selection_start_time = None
-    selected_tomato = None
+    dwell_selector.reset()
 
     # initialize robot controller (only when robot-control option is True)
     # if robot_controller.connect():
@@ -94,155 +374,176 @@ def process_video():
         zoom_scale = 1.0
         print("[INFO] No saved zoom scale found, using default: 1.0x")
 
-    while thread_running:
-        ret, frame = cap.read()
-        if not ret:
-            print("[Error] failed to read frame")
-            break
-        
-        # Apply zoom to the frame
-        if zoom_scale != 1.0:
-            height, width = frame.shape[:2]
-            center_x, center_y = width // 2, height // 2
-            
-            new_width = int(width / zoom_scale)
-            new_height = int(height / zoom_scale)
-            
-            x1 = center_x - new_width // 2
-            y1 = center_y - new_height // 2
-            x2 = x1 + new_width
-            y2 = y1 + new_height
-            
-            frame = frame[y1:y2, x1:x2]
-            frame = cv2.resize(frame, (width, height))
-
-        debug_image = frame.copy()
-        current_time = time.time()
-
-        if showing_completion:
-            if current_time - completion_message_start <= 3.0:
-                _, buffer = cv2.imencode('.jpg', debug_image)
-                frame_base64 = base64.b64encode(buffer).decode('utf-8')
-                socketio.emit('video_frame', {'image': frame_base64})
-                continue
-            else:
-                showing_completion = False
-                completion_message_start = None
-                selected_tomato = None
-                robot_executing = False
-
-        if not robot_executing:
-            debug_image, _, _, landmark_list = hand_tracker.process_frame(frame, debug_image, None, None, mode='inference')
-            
-            if landmark_list is not None:
-                current_point_coord = landmark_list[8]
-                last_hand_detection_time = current_time
-                robot_ready = True
-                if stream_paused:
-                    print("Hand detected, resuming stream")
-                    stream_paused = False
-                    socketio.emit('segment_status', {'detected': True, 'resumed': True})
-                
-                if mode == 'inference' and hand_tracker.prev_hand_gesture != "open":
-                    nearest_tomato, distance = hand_tracker.find_nearest_tomato(landmark_list[8])
-                    
-                    if nearest_tomato and distance < 100:
-                        if last_nearest_tomato != nearest_tomato:
-                            last_nearest_tomato = nearest_tomato
-                            selection_start_time = current_time
-                            selected_tomato = None
-                            socketio.emit('tomato_match_result', {'matched_id': nearest_tomato})
-                        else:
-                            if selection_start_time is not None:
-                                selection_duration = current_time - selection_start_time
-                                
-                                if selection_duration < 1.5:
-                                    socketio.emit('tomato_match_result', {
-                                        'matched_id': nearest_tomato,
-                                        'selection_time': selection_duration,
-                                        'status': 'detecting'
-                                    })
-                                elif selection_duration < 3.5:
-                                    socketio.emit('tomato_match_result', {
-                                        'matched_id': nearest_tomato,
-                                        'selection_time': selection_duration,
-                                        'status': 'confirming'
-                                    })
-                                else:
-                                    if selected_tomato != nearest_tomato:
-                                        selected_tomato = nearest_tomato
-                                        print(f"Selected tomato: {nearest_tomato}")
-                                        if not robot_executing:
-                                            socketio.emit('execute_robot_sequence', {'tomato_id': nearest_tomato})
-                                    socketio.emit('tomato_match_result', {
-                                        'matched_id': nearest_tomato,
-                                        'selection_time': selection_duration,
-                                        'status': 'selected'
-                                    })
-                    else:
-                        last_nearest_tomato = None
-                        selection_start_time = None
-                        selected_tomato = None
-                        socketio.emit('tomato_match_result', {'matched_id': None})
-                else:
-                    last_nearest_tomato = None
-                    selection_start_time = None
-                    selected_tomato = None
-                    socketio.emit('tomato_match_result', {'matched_id': None})
-                    
-            elif current_time - last_hand_detection_time > 5.0 and not showing_completion:
-                if not stream_paused:
-                    print("No hand detected for 5 seconds, pausing stream")
-                    socketio.emit('segment_status', {'detected': False, 'timeout': True})
-                    socketio.emit('tomato_match_result', {'matched_id': None})
-                    stream_paused = True
-                continue
-
-            if selected_tomato is not None:
-                tomato_key = f"tomato_{selected_tomato}"
-                center = hand_tracker.tomato_coordinates[tomato_key]["center"]
-                if center:
-                    cv2.circle(debug_image, (center["x"], center["y"]), 8, (0, 255, 0), -1)
-                    cv2.circle(debug_image, (center["x"], center["y"]), 12, (0, 255, 0), 2)
-
-            _, buffer = cv2.imencode('.jpg', debug_image)
-            frame_base64 = base64.b64encode(buffer).decode('utf-8')
-            socketio.emit('video_frame', {'image': frame_base64})
-        
-        time.sleep(0.01)
-
-    if cap.isOpened():
-        cap.release()
+    # capture -> inference -> annotate -> encode, each stage on its own thread
+    video_pipeline = Pipeline(grabber_source(grabber), [
+        ('inference', inference_stage),
+        ('annotate', annotate_stage),
+        ('encode', encode_stage),
+    ]).start()
+
+    while thread_running and not video_pipeline.wait(timeout=1.0):
+        pass
+    video_pipeline.stop()
+
+    print(f"[INFO] Capture stopped: {grabber.frames_captured} frames captured, {grabber.frames_dropped} dropped, "
+          f"{frame_scheduler.deadline_misses} deadline misses")
+    grabber.stop()
+    thread_running = False
+
+def start_video_thread():
+    global thread_running
+    with video_thread_lock:
+        if not thread_running:
+            thread_running = True
+            thread = threading.Thread(target=process_video)
+            thread.start()
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
 @socketio.on('start_stream')
-def start_stream():
-    global thread_running
-    if not thread_running:
-        thread = threading.Thread(target=process_video)
-        thread.start()
+def start_stream(data=None):
+    data = data or {}
+    transport, tier = frame_broadcaster.add_client(request.sid, data.get('transport'), data.get('ack', False), data.get('tier'))
+    print(f"[INFO] Client {request.sid} streaming with {transport} frames ({tier} tier)")
+    # a (re)connecting client gets the current selection / stream state right away
+    state_events.sync_client(request.sid)
+    start_video_thread()
+
+@socketio.on('frame_ack')
+def handle_frame_ack(data):
+    frame_id = data.get('frame_id')
+    if frame_id is not None:
+        frame_broadcaster.ack(request.sid, frame_id)
+
+    capture_ms, rendered_ms = data.get('timestamp'), data.get('rendered_at')
+    if capture_ms is not None and rendered_ms is not None:
+        glass_to_glass.on_render(request.sid, capture_ms, rendered_ms, frame_id)
+    ping = glass_to_glass.ping_due(request.sid)
+    if ping is not None:
+        emit('clock_ping', ping)
+
+@socketio.on('clock_pong')
+def handle_clock_pong(data):
+    server_ms, client_ms = data.get('server_ms'), data.get('client_ms')
+    if server_ms is not None and client_ms is not None:
+        glass_to_glass.on_pong(request.sid, server_ms, client_ms)
+
+@socketio.on('subscribe_tier')
+def handle_subscribe_tier(data):
+    tier = data.get('tier')
+    if frame_broadcaster.subscribe(request.sid, tier):
+        print(f"[INFO] Client {request.sid} switched to {tier} tier")
+
+@app.route('/video_feed.mjpg')
+def mjpeg_feed():
+    """annotated feed for <img>-based displays, e.g. /video_feed.mjpg?tier=medium"""
+    start_video_thread()
+    return Response(mjpeg_stream(frame_broadcaster.encoder, request.args.get('tier')), mimetype=MJPEG_MIMETYPE)
+
+@app.route('/stream_stats')
+def stream_stats():
+    return jsonify({
+        'clients': frame_broadcaster.stats(),
+        'encoded_frames': frame_broadcaster.encoder.frames,
+        'encodes': frame_broadcaster.encoder.encodes,
+        'mjpeg_viewers': frame_broadcaster.encoder.viewers,
+        'scheduler': frame_scheduler.stats(),
+        'state_events': state_events.stats(),
+        'latency_ms': metrics.summary(),
+        'glass_to_glass': glass_to_glass.stats(),
+        'robot_job': robot_jobs.current.to_dict() if robot_jobs.current is not None else None,
+        'pipeline': video_pipeline.stats() if video_pipeline is not None else None
+    })
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape target: stage latency histograms (with p50/p95/p99), counters and gauges"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    frame_broadcaster.remove_client(request.sid)
+    state_events.remove_client(request.sid)
+    glass_to_glass.remove_client(request.sid)
+
+def on_robot_job(job):
+    """robot executor thread: forward job progress to the clients and leave the executing state when it ends"""
+    global robot_ready, robot_executing, completion_message_start, showing_completion
+
+    socketio.emit('robot_job', job.to_dict())
+    if job.status == JOB_COMPLETED:
+        print(f"[INFO] Successfully executed sequence {job.sequence_number}")
+        showing_completion = True
+        completion_message_start = time.time()
+        robot_ready = False
+        notify_state_change()
+        socketio.emit('robot_sequence_complete', {'tomato_id': job.sequence_number})
+    elif job.status in (JOB_FAILED, JOB_CANCELLED):
+        print(f"[INFO] Robot job {job.job_id} {job.status}" + (f": {job.error}" if job.error else ""))
+        robot_executing = False
+        notify_state_change()
+
+robot_dispatch_lock = threading.Lock()
+
+def submit_robot_job(tomato_id):
+    """start a pick unless the robot is busy or not ready; returns (job, None) or (None, reason)"""
+    global robot_executing
+
+    with robot_dispatch_lock:
+        if not robot_ready or robot_executing:
+            return None, 'robot busy' if robot_executing else 'robot not ready'
+        # set before submitting: a job that fails at once clears it again from the executor thread
+        robot_executing = True
+        job, reason = robot_jobs.submit(tomato_id)
+        if job is None:
+            robot_executing = False
+        return job, reason
+
+def dispatch_pick(tomato_id):
+    """hand a confirmed selection straight to the robot; the clients are only notified"""
+    job, reason = submit_robot_job(tomato_id)
+    if job is None:
+        print(f"[INFO] Pick of tomato {tomato_id} not started: {reason}")
+        socketio.emit('robot_pick_rejected', {'tomato_id': tomato_id, 'reason': reason})
+        return None
+    metrics.inc('robot_triggers')
+    socketio.emit('robot_pick_dispatched', {'tomato_id': tomato_id, 'job_id': job.job_id})
+    return job
 
 @socketio.on('execute_robot_sequence')
 def handle_robot_sequence(data):
-    global frame, robot_ready, robot_executing, completion_message_start, showing_completion
-
+    """manual trigger (confirmed selections are dispatched by the server); progress arrives as robot_job events"""
     tomato_id = data.get('tomato_id')
-    if tomato_id is not None and robot_controller and robot_ready and not robot_executing:
-        try:
-            robot_executing = True
-            success = robot_controller.execute_sequence(tomato_id)
-            if success:
-                print(f"[INFO] Successfully executed sequence {tomato_id}")
-                showing_completion = True
-                completion_message_start = time.time()
-                socketio.emit('robot_sequence_complete', {'tomato_id': tomato_id})
-                robot_ready = False
-        except Exception as e:
-            print(f"[ERROR] Failed to execute robot sequence: {e}")
-            robot_executing = False
+    if tomato_id is None or not robot_controller:
+        return {'accepted': False, 'reason': 'no tomato_id'}
+
+    job, reason = submit_robot_job(tomato_id)
+    if job is None:
+        return {'accepted': False, 'reason': reason}
+    return {'accepted': True, 'job_id': job.job_id}
+
+@socketio.on('cancel_robot_job')
+def handle_cancel_robot_job(data):
+    job_id = data.get('job_id')
+    if job_id is None and robot_jobs.current is not None:
+        job_id = robot_jobs.current.job_id
+    return {'cancelled': robot_jobs.cancel(job_id)}
+
+def setup():
+    """create the hand tracker and the robot job queue (the parts that load models or start threads)"""
+    global hand_tracker, dwell_selector, robot_controller, robot_jobs
+    # imported here: it pulls in TensorFlow and MediaPipe
+    from src.hand_gesture.hand_tracker import HandTracker
+
+    hand_tracker = HandTracker(inference_workers=INFERENCE_WORKERS, metrics=metrics, keyframe_interval=KEYFRAME_INTERVAL,
+                               inference_width=INFERENCE_WIDTH, hand_roi=HAND_ROI,
+                               backend=LANDMARK_BACKEND, landmarker_model=LANDMARKER_MODEL)
+    dwell_selector = DwellSelector(hand_tracker)
+    robot_controller = RobotSequenceController()
+    robot_jobs = RobotJobQueue(robot_controller, listener=on_robot_job)
 
 if __name__ == '__main__':
+    setup()
     socketio.run(app, host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
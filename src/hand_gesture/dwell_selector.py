@@ -0,0 +1,72 @@
+class DwellSelector:
+    """select a tomato once the pointing finger dwells near its saved center"""
+
+    def __init__(self, hand_tracker, max_distance=100, detect_time=1.5, confirm_time=3.5):
+        self.hand_tracker = hand_tracker
+        self.max_distance = max_distance
+        self.detect_time = detect_time
+        self.confirm_time = confirm_time
+
+        self.last_nearest_tomato = None
+        self.selection_start_time = None
+        self.selected_tomato = None
+        # tomato confirmed during the current dwell; a dwell confirms at most once
+        self.confirmed_tomato = None
+
+    def reset(self):
+        self.last_nearest_tomato = None
+        self.selection_start_time = None
+        self.selected_tomato = None
+        self.confirmed_tomato = None
+
+    def clear_selection(self):
+        """drop the highlighted selection but keep the dwell, so it is not confirmed again"""
+        self.selected_tomato = None
+
+    def update(self, point, current_time, active=True):
+        """
+        update the dwell state with the current fingertip position
+
+        returns (match_result, confirmed_tomato): match_result is the tomato_match_result
+        payload for this frame (or None), confirmed_tomato is set only on the frame a
+        selection is confirmed
+        """
+        if not active:
+            self.reset()
+            return {'matched_id': None}, None
+
+        nearest_tomato, distance = self.hand_tracker.find_nearest_tomato(point)
+
+        if not nearest_tomato or distance >= self.max_distance:
+            self.reset()
+            return {'matched_id': None}, None
+
+        if self.last_nearest_tomato != nearest_tomato:
+            self.last_nearest_tomato = nearest_tomato
+            self.selection_start_time = current_time
+            self.selected_tomato = None
+            self.confirmed_tomato = None
+            return {'matched_id': nearest_tomato}, None
+
+        if self.selection_start_time is None:
+            return None, None
+
+        selection_duration = current_time - self.selection_start_time
+        confirmed_tomato = None
+
+        if selection_duration < self.detect_time:
+            status = 'detecting'
+        elif selection_duration < self.confirm_time:
+            status = 'confirming'
+        else:
+            status = 'selected'
+            if self.confirmed_tomato != nearest_tomato:
+                self.selected_tomato = nearest_tomato
+                self.confirmed_tomato = nearest_tomato
+                confirmed_tomato = nearest_tomato
+
+        return {
+            'matched_id': nearest_tomato,
+            'selection_time': selection_duration,
+            'status': status
+        }, confirmed_tomato
@@ -0,0 +1,70 @@
+import numpy as np
+
+from src.hand_gesture.inference_pool import landmarks_to_results
+
+
+def results_to_array(results):
+    """(hands, 21, 3) float32 array of the normalized landmarks in a Hands.process()-like result"""
+    return np.array([[(lm.x, lm.y, lm.z) for lm in hand.landmark] for hand in results.multi_hand_landmarks],
+                    dtype=np.float32)
+
+
+class HandRoi(object):
+    """
+    crop window around the hand found in the previous frame
+
+    landmarking on the crop instead of the whole frame wastes far fewer pixels
+    when the hand is small. the window is the landmark bounding box grown by
+    expand (at least min_size of the shorter frame side) and stays put while the
+    hand remains inside its inner area, so MediaPipe's own frame-to-frame tracking
+    sees a stable image most of the time
+    """
+
+    def __init__(self, expand=2.0, min_size=0.35, margin=0.15):
+        self.expand = expand
+        self.min_size = min_size
+        self.margin = margin
+        self.window = None
+
+        self.crops = 0
+        self.fallbacks = 0
+
+    def clear(self):
+        self.window = None
+
+    def _fits(self, x0, y0, x1, y1, size):
+        wx0, wy0, wx1, wy1 = self.window
+        width, height = wx1 - wx0, wy1 - wy0
+        inset_x, inset_y = width * self.margin, height * self.margin
+        inside = x0 >= wx0 + inset_x and y0 >= wy0 + inset_y and x1 <= wx1 - inset_x and y1 <= wy1 - inset_y
+        return inside and 0.7 <= size / max(width, height) <= 1.4
+
+    def update(self, landmarks, width, height):
+        """place the window around landmarks, a (21, 3) array in full-frame normalized coordinates"""
+        x0, y0 = landmarks[:, 0].min() * width, landmarks[:, 1].min() * height
+        x1, y1 = landmarks[:, 0].max() * width, landmarks[:, 1].max() * height
+        size = max(x1 - x0, y1 - y0) * self.expand
+        size = min(max(size, self.min_size * min(width, height)), min(width, height))
+
+        if self.window is not None and self._fits(x0, y0, x1, y1, size):
+            return self.window
+
+        cx, cy = (x0 + x1) / 2.0, (y0 + y1) / 2.0
+        left = int(np.clip(cx - size / 2.0, 0, width - size))
+        top = int(np.clip(cy - size / 2.0, 0, height - size))
+        self.window = (left, top, left + int(size), top + int(size))
+        return self.window
+
+    def crop(self, image):
+        x0, y0, x1, y1 = self.window
+        self.crops += 1
+        return image[y0:y1, x0:x1]
+
+    def to_frame(self, results, width, height):
+        """map a result computed on the crop back to full-frame normalized coordinates"""
+        x0, y0, x1, y1 = self.window
+        landmarks = results_to_array(results)
+        landmarks[:, :, 0] = (landmarks[:, :, 0] * (x1 - x0) + x0) / width
+        landmarks[:, :, 1] = (landmarks[:, :, 1] * (y1 - y0) + y0) / height
+        landmarks[:, :, 2] *= (x1 - x0) / width
+        return landmarks_to_results(landmarks, results.multi_handedness)
@@ -3,27 +3,77 @@ import csv
 import cv2 as cv
 import numpy as np
 import mediapipe as mp
-from collections import deque, Counter
+from collections import deque, Counter, namedtuple
 import json
 from datetime import datetime
 import os
 
 from src.hand_gesture.model import KeyPointClassifier, PointHistoryClassifier
+from src.hand_gesture.inference_pool import LandmarkWorkerPool, landmarks_to_results
+from src.hand_gesture.landmark_flow import LandmarkFlowTracker
+from src.hand_gesture.hand_roi import HandRoi, results_to_array
+from src.hand_gesture.point_history import PointHistory
 from src.hand_gesture.utils.logging import logging_csv
 from src.hand_gesture.utils.preprocessing import pre_process_landmark, pre_process_point_history
-from src.hand_gesture.utils.visualization import calc_bounding_rect, calc_landmark_list, draw_bounding_rect, draw_landmarks, draw_info_text, draw_point_history, draw_info
+from src.hand_gesture.utils.visualization import calc_landmark_array, landmark_bounding_rect, draw_bounding_rect, draw_landmarks, draw_info_text, draw_point_history, draw_info
 from src.hand_gesture.utils.actions import action_for_sign
+from src.streaming.metrics import timed
+
+HandDetection = namedtuple('HandDetection', ['landmark_list', 'brect', 'prompt_point', 'expected_point_coords', 'point_history'])
 
 class HandTracker:
-    def __init__(self):
-        self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
+    def __init__(self, inference_workers=0, metrics=None, keyframe_interval=1, inference_width=None, hand_roi=False,
+                 backend='solutions', landmarker_model=None):
+        # optional MetricsRegistry for hands.process / classifier latencies
+        self.metrics = metrics
+
+        hands_kwargs = dict(
             static_image_mode=False,
             max_num_hands=1,
             min_detection_confidence=0.7,
             min_tracking_confidence=0.5
         )
 
+        # backend 'solutions' uses the blocking Hands.process(), in this process or with
+        # inference_workers > 0 in separate processes (see inference_pool.py); backend 'tasks'
+        # uses the asynchronous Tasks HandLandmarker with the landmarker_model .task file
+        self.mp_hands = mp.solutions.hands
+        self.inference_pool = None
+        self.live_landmarker = None
+        self.hands = None
+        if backend == 'tasks':
+            from src.hand_gesture.live_landmarker import LiveStreamLandmarker
+            self.live_landmarker = LiveStreamLandmarker(
+                landmarker_model,
+                num_hands=hands_kwargs['max_num_hands'],
+                min_detection_confidence=hands_kwargs['min_detection_confidence'],
+                min_tracking_confidence=hands_kwargs['min_tracking_confidence']
+            )
+            # results arrive a frame late (the same one again while the graph is busy), after the crop
+            # window has moved and out of step with the frame optical flow would start from
+            if hand_roi:
+                print("[INFO] Hand ROI cropping is not used with the tasks backend")
+                hand_roi = False
+            if keyframe_interval > 1:
+                print("[INFO] Optical-flow keyframing is not used with the tasks backend")
+                keyframe_interval = 1
+        elif inference_workers > 0:
+            self.inference_pool = LandmarkWorkerPool(num_workers=inference_workers, **hands_kwargs)
+        else:
+            self.hands = self.mp_hands.Hands(**hands_kwargs)
+
+        # MediaPipe gets a copy downscaled to inference_width; its landmarks are normalized,
+        # so they come back in full-resolution coordinates for drawing and saved tomato positions
+        self.inference_width = inference_width
+
+        # with hand_roi MediaPipe only sees a crop around the previous hand until it is lost
+        self.hand_roi = HandRoi() if hand_roi else None
+
+        # with keyframe_interval > 1 MediaPipe runs on at most every Nth frame and the
+        # landmarks are carried over the frames in between with optical flow
+        self.landmark_flow = LandmarkFlowTracker(max_interval=keyframe_interval) if keyframe_interval > 1 else None
+        self._flow_handedness = None
+
         self.keypoint_classifier = KeyPointClassifier()
         self.point_history_classifier = PointHistoryClassifier()
 
@@ -32,14 +82,22 @@ class HandTracker:
         self.point_history_classifier_labels = self._load_labels('src/hand_gesture/model/point_history_classifier/point_history_classifier_label.csv')
 
         self.history_length = 16
-        self.point_history = deque(maxlen=self.history_length)
+        self.point_history = PointHistory(self.history_length)
         self.finger_gesture_history = deque(maxlen=self.history_length)
 
+        # classifier inputs, preprocessed in place every frame
+        self._landmark_input = np.zeros((1, 21 * 2), dtype=np.float32)
+        self._point_history_input = np.zeros((1, self.history_length * 2), dtype=np.float32)
+
         self.prev_hand_gesture = "None"
         self.prev_finger_gesture = "None"
 
         self.tomato_coords_file = 'src/hand_gesture/data/tomato_coordinates.json'
         self.tomato_coordinates = self.load_tomato_coordinates()
+        # saved tomatoes are matched and drawn in the displayed frame; the camera pixel recorded with
+        # each one is projected through the current zoom / undistortion (see set_view)
+        self.view = (None, 1.0, None)
+        self._center_cache = (None, [], np.zeros((0, 2), dtype=np.int32))
 
         self.recording_tomato_id = None
         self.selection_start_time = None
@@ -76,8 +134,8 @@ class HandTracker:
         
         return initial_data
     
-    def save_tomato_coordinate(self, tomato_id, point_coords, zoom_scale=1.0):
-        """save the tomato pointing coordinates with zoom scale"""
+    def save_tomato_coordinate(self, tomato_id, point_coords, zoom_scale=1.0, camera_coords=None):
+        """save the tomato pointing coordinates with zoom scale (and raw camera pixel coordinates if given)"""
         if not isinstance(tomato_id, int) or not (1 <= tomato_id <= 4):
             return False
             
@@ -87,6 +145,9 @@ class HandTracker:
             "zoom_scale": zoom_scale,
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
+        if camera_coords is not None:
+            coord["camera_x"] = int(camera_coords[0])
+            coord["camera_y"] = int(camera_coords[1])
         
         tomato_key = f"tomato_{tomato_id}"
         self.tomato_coordinates[tomato_key]["coordinates"].append(coord)
@@ -112,92 +173,221 @@ class HandTracker:
                 "y": int(y_mean),
                 "zoom_scale": zoom_mean
             }
+
+            camera_coords = [c for c in coords if "camera_x" in c]
+            if camera_coords:
+                self.tomato_coordinates[tomato_key]["center"]["camera_x"] = int(sum(c["camera_x"] for c in camera_coords) / len(camera_coords))
+                self.tomato_coordinates[tomato_key]["center"]["camera_y"] = int(sum(c["camera_y"] for c in camera_coords) / len(camera_coords))
     
+    def set_view(self, view_transform, zoom_scale, frame_size):
+        """transform, zoom and size of the displayed frames, used to place the saved tomatoes in them"""
+        self.view = (view_transform, zoom_scale, tuple(frame_size))
+
+    def _display_point(self, center):
+        """a saved center in the current displayed frame"""
+        view_transform, zoom_scale, frame_size = self.view
+        if view_transform is None:
+            return center["x"], center["y"]
+        if "camera_x" in center:
+            camera_point = (center["camera_x"], center["camera_y"])
+        else:
+            # saved before camera coordinates were recorded: undo the zoom it was saved at
+            camera_point = view_transform.display_to_camera((center["x"], center["y"]), frame_size,
+                                                            center.get("zoom_scale", 1.0))
+        return view_transform.camera_to_display(camera_point, frame_size, zoom_scale)
+
+    def _tomato_centers(self):
+        """
+        (ids, (n, 2) array of centers in the displayed frame) of the tomatoes that have one,
+        rebuilt only when a center or the view changes
+        """
+        centers = [(tomato_id, self.tomato_coordinates[f"tomato_{tomato_id}"]["center"]) for tomato_id in range(1, 5)]
+        key = (self.view, tuple((tomato_id, tuple(sorted(center.items()))) for tomato_id, center in centers if center))
+        cache = self._center_cache
+        if cache[0] != key:
+            ids = [tomato_id for tomato_id, center in centers if center]
+            points = np.array([self._display_point(center) for _, center in centers if center], dtype=np.int32)
+            # one tuple, so the annotate thread never sees ids and points from different views
+            cache = self._center_cache = (key, ids, points.reshape(-1, 2))
+        return cache[1], cache[2]
+
+    def tomato_center(self, tomato_id):
+        """(x, y) of a saved tomato in the displayed frame, or None"""
+        tomato_ids, centers = self._tomato_centers()
+        if tomato_id not in tomato_ids:
+            return None
+        x, y = centers[tomato_ids.index(tomato_id)]
+        return int(x), int(y)
+
     def find_nearest_tomato(self, current_point):
         """find the nearest tomato from current point"""
-        min_dist = float('inf')
-        nearest_tomato = None
-        
-        for tomato_id in range(1, 5):
-            tomato_key = f"tomato_{tomato_id}"
-            center = self.tomato_coordinates[tomato_key]["center"]
-            
-            if center:
-                dist = np.sqrt(
-                    # (current_point[0] - center["x"])**2 + 
-                    # (current_point[1] - center["y"])**2
-                    (current_point[0] - center["x"])**2
-                )
-                if dist < min_dist:
-                    min_dist = dist
-                    nearest_tomato = tomato_id
-        
-        return nearest_tomato, min_dist
+        tomato_ids, centers = self._tomato_centers()
+        if not tomato_ids:
+            return None, float('inf')
+
+        # horizontal distance only (the rows of tomatoes are told apart by x)
+        distances = np.abs(centers[:, 0] - current_point[0])
+        nearest = int(np.argmin(distances))
+
+        return tomato_ids[nearest], float(distances[nearest])
 
     def draw_tomato_centers(self, debug_image):
         """draw the tomato centers on the image"""
-        for tomato_id in range(1, 5):
-            tomato_key = f"tomato_{tomato_id}"
-            center = self.tomato_coordinates[tomato_key]["center"]
+        tomato_ids, centers = self._tomato_centers()
+        for tomato_id, (x, y) in zip(tomato_ids, centers.tolist()):
+            cross_size = 15
+            outer_thickness = 6
+            inner_thickness = 3
+            
+            cv.line(debug_image, (x - cross_size, y), (x + cross_size, y), (0, 0, 0), outer_thickness)
+            cv.line(debug_image, (x, y - cross_size), (x, y + cross_size), (0, 0, 0), outer_thickness)
+            
+            cv.line(debug_image, (x - cross_size, y),  (x + cross_size, y), (255, 255, 255), inner_thickness)
+            cv.line(debug_image, (x, y - cross_size), (x, y + cross_size), (255, 255, 255), inner_thickness)
+            
+            text = f"{tomato_id}"
+            font_scale = 1.2
+            font_thickness = 2
+            
+            (text_width, text_height), _ = cv.getTextSize(text, cv.FONT_HERSHEY_SIMPLEX, font_scale, font_thickness)
+            
+            text_x = x + cross_size + 5
+            text_y = y - cross_size - 5
+            
+            cv.putText(debug_image, text, (text_x, text_y), cv.FONT_HERSHEY_SIMPLEX, font_scale, (0, 0, 0), font_thickness + 3)
+            
+            cv.putText(debug_image, text, (text_x, text_y), cv.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), font_thickness)
             
-            if center:
-                x, y = center["x"], center["y"]
-                
-                cross_size = 15
-                outer_thickness = 6
-                inner_thickness = 3
-                
-                cv.line(debug_image, (x - cross_size, y), (x + cross_size, y), (0, 0, 0), outer_thickness)
-                cv.line(debug_image, (x, y - cross_size), (x, y + cross_size), (0, 0, 0), outer_thickness)
-                
-                cv.line(debug_image, (x - cross_size, y),  (x + cross_size, y), (255, 255, 255), inner_thickness)
-                cv.line(debug_image, (x, y - cross_size), (x, y + cross_size), (255, 255, 255), inner_thickness)
-                
-                text = f"{tomato_id}"
-                font_scale = 1.2
-                font_thickness = 2
-                
-                (text_width, text_height), _ = cv.getTextSize(text, cv.FONT_HERSHEY_SIMPLEX, font_scale, font_thickness)
-                
-                text_x = x + cross_size + 5
-                text_y = y - cross_size - 5
-                
-                cv.putText(debug_image, text, (text_x, text_y), cv.FONT_HERSHEY_SIMPLEX, font_scale, (0, 0, 0), font_thickness + 3)
-                
-                cv.putText(debug_image, text, (text_x, text_y), cv.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), font_thickness)
-                
         return debug_image
 
-    def process_frame(self, image, debug_image, number, key, use_point_tracker=False, mode=None):
+    def _inference_image(self, image):
+        height, width = image.shape[:2]
+        if self.inference_width is None or width <= self.inference_width:
+            return image
+        size = (self.inference_width, max(1, int(round(height * self.inference_width / width))))
+        return cv.resize(image, size, interpolation=cv.INTER_AREA)
+
+    def _process_landmarks(self, image, wait=False, tracking=True):
+        image = self._inference_image(image)
+        if self.live_landmarker is not None:
+            # never blocks unless asked to: the newest finished result, usually the previous frame's
+            with timed(self.metrics, 'hands_process'):
+                return self.live_landmarker.process(image, timeout=0.5 if wait else 0.0)
+
+        if self.inference_pool is not None:
+            with timed(self.metrics, 'hands_process'):
+                return self.inference_pool.process(image, tracking)
+
         image_rgb = cv.cvtColor(image, cv.COLOR_BGR2RGB)
         image_rgb.flags.writeable = False
-        results = self.hands.process(image_rgb)
+        with timed(self.metrics, 'hands_process'):
+            results = self.hands.process(image_rgb)
         image_rgb.flags.writeable = True
+        return results
+
+    def _reserve_pool_slots(self, image):
+        """size the worker pool's frame slots for the largest image this frame size can send to MediaPipe"""
+        height, width = image.shape[:2]
+        if self.inference_width is not None and width > self.inference_width:
+            height = max(1, int(round(height * self.inference_width / width)))
+            width = self.inference_width
+        # the downscaled full frame, or a square hand ROI crop that is at most as wide
+        self.inference_pool.reserve(width * max(width, height) * image.shape[2])
+
+    def _detect_landmarks(self, image):
+        """MediaPipe on the crop around the previous hand, or on the whole frame when there is none or it was lost"""
+        if self.inference_pool is not None:
+            self._reserve_pool_slots(image)
+        if self.hand_roi is None:
+            return self._process_landmarks(image)
+
+        height, width = image.shape[:2]
+        results = None
+        if self.hand_roi.window is not None:
+            results = self._process_landmarks(self.hand_roi.crop(image))
+            if results.multi_hand_landmarks is not None:
+                results = self.hand_roi.to_frame(results, width, height)
+            else:
+                self.hand_roi.fallbacks += 1
+                results = None
+
+        if results is None:
+            results = self._process_landmarks(image)
+
+        if results.multi_hand_landmarks is not None:
+            self.hand_roi.update(results_to_array(results)[0], width, height)
+        else:
+            self.hand_roi.clear()
+        return results
+
+    def _track_landmarks(self, image):
+        """MediaPipe on keyframes, optical-flow propagation of the previous landmarks in between"""
+        if self.landmark_flow is None:
+            return self._detect_landmarks(image)
+
+        height, width = image.shape[:2]
+        gray = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
+        if not self.landmark_flow.due():
+            with timed(self.metrics, 'landmark_flow'):
+                points = self.landmark_flow.propagate(gray)
+            if points is not None:
+                landmarks = self.landmark_flow.normalized(width, height)
+                if self.hand_roi is not None:
+                    self.hand_roi.update(landmarks, width, height)
+                return landmarks_to_results(landmarks[np.newaxis], self._flow_handedness)
+
+        results = self._detect_landmarks(image)
+        if results.multi_hand_landmarks is not None:
+            hand = results.multi_hand_landmarks[0]
+            points = np.array([(lm.x * width, lm.y * height, lm.z) for lm in hand.landmark], dtype=np.float32)
+            self.landmark_flow.keyframe(gray, points)
+            self._flow_handedness = results.multi_handedness[:1]
+        else:
+            self.landmark_flow.clear()
+        return results
+
+    def has_hand(self, image):
+        """landmarking only, no classifiers and no history updates; for presence probes on small frames"""
+        # kept off the worker that tracks the live stream when there is a spare one
+        return self._process_landmarks(image, wait=True, tracking=False).multi_hand_landmarks is not None
+
+    def detect(self, image, number=None, use_point_tracker=False, mode=None):
+        """run landmarking and gesture classification on image, updating the gesture and point history"""
+        results = self._track_landmarks(image)
 
         prompt_point = None
         expected_point_coords = None
         landmark_list = None
+        brect = None
 
         if results.multi_hand_landmarks is not None:
             for hand_landmarks, handedness in zip(results.multi_hand_landmarks, results.multi_handedness):
-                brect = calc_bounding_rect(debug_image, hand_landmarks)
-                landmark_list = calc_landmark_list(debug_image, hand_landmarks)
+                # one (21, 2) int32 array shared by the bounding rect, classifiers, drawing and tomato matching
+                landmark_list = calc_landmark_array(image, hand_landmarks)
+                brect = landmark_bounding_rect(landmark_list)
+
+                pre_processed_landmark_list = pre_process_landmark(landmark_list, out=self._landmark_input)
 
-                pre_processed_landmark_list = pre_process_landmark(landmark_list)
-                pre_processed_point_history_list = pre_process_point_history(debug_image, self.point_history)
+                # the point history is only preprocessed when the classifier (or mode 2 logging) will read it
+                run_point_history = self.point_history.full
+                pre_processed_point_history_list = None
+                if run_point_history or mode == 2:
+                    pre_processed_point_history_list = pre_process_point_history(
+                        image, self.point_history.points(), out=self._point_history_input)
 
                 logging_csv(number, mode, pre_processed_landmark_list, pre_processed_point_history_list)
 
-                hand_sign_id = self.keypoint_classifier(pre_processed_landmark_list)
+                with timed(self.metrics, 'keypoint_classifier'):
+                    hand_sign_id = self.keypoint_classifier(pre_processed_landmark_list)
                 if hand_sign_id == 2:  # Point gesture
                     self.point_history.append(landmark_list[8])
                 else:
                     self.point_history.append([0, 0])
 
-                point_history_len = len(pre_processed_point_history_list)
                 finger_gesture_id = 0
-                if point_history_len == (self.history_length * 2):
-                    finger_gesture_id = self.point_history_classifier(pre_processed_point_history_list)
+                if run_point_history:
+                    with timed(self.metrics, 'point_history_classifier'):
+                        finger_gesture_id = self.point_history_classifier(pre_processed_point_history_list)
 
                 self.finger_gesture_history.append(finger_gesture_id)
                 most_common_fg_id = Counter(self.finger_gesture_history).most_common()
@@ -213,13 +403,27 @@ class HandTracker:
                 if point_coords is not None:
                     prompt_point = point_coords
 
-                debug_image = draw_bounding_rect(True, debug_image, brect)
-                debug_image = draw_landmarks(debug_image, landmark_list)
-
         else:
             self.point_history.append([0, 0])
 
-        debug_image = draw_point_history(debug_image, self.point_history)
+        # snapshot the history so drawing can happen on another thread while the next frame is detected
+        return HandDetection(landmark_list, brect, prompt_point, expected_point_coords, self.point_history.snapshot())
+
+    def draw(self, debug_image, detection):
+        """draw the hand, point history and tomato centers of a detect() result"""
+        if detection.landmark_list is not None:
+            debug_image = draw_bounding_rect(True, debug_image, detection.brect)
+            debug_image = draw_landmarks(debug_image, detection.landmark_list)
+
+        debug_image = draw_point_history(debug_image, detection.point_history)
         debug_image = self.draw_tomato_centers(debug_image)
 
-        return debug_image, prompt_point, expected_point_coords, landmark_list
\ No newline at end of file
+        return debug_image
+
+    def process_frame(self, image, debug_image, number, key, use_point_tracker=False, mode=None, draw=True):
+        detection = self.detect(image, number, use_point_tracker, mode)
+
+        if draw:
+            debug_image = self.draw(debug_image, detection)
+
+        return debug_image, detection.prompt_point, detection.expected_point_coords, detection.landmark_list
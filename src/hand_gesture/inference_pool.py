@@ -0,0 +1,314 @@
+import autorootcwd
+import itertools
+import multiprocessing as mp_proc
+import queue
+import threading
+from collections import namedtuple
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait as wait_connections
+
+import cv2 as cv
+import numpy as np
+
+# light stand-ins for the MediaPipe result protos, enough for calc_bounding_rect / calc_landmark_list
+NormalizedLandmark = namedtuple('NormalizedLandmark', ['x', 'y', 'z'])
+HandLandmarks = namedtuple('HandLandmarks', ['landmark'])
+LandmarkResults = namedtuple('LandmarkResults', ['multi_hand_landmarks', 'multi_handedness'])
+
+EMPTY_RESULTS = LandmarkResults(None, None)
+
+
+def landmarks_to_results(landmarks, handedness):
+    """rebuild a Hands.process()-like result from the (hands, 21, 3) array a worker sends back"""
+    if landmarks is None:
+        return EMPTY_RESULTS
+    hands = [HandLandmarks([NormalizedLandmark(*point) for point in hand.tolist()]) for hand in landmarks]
+    return LandmarkResults(hands, handedness)
+
+
+def _landmark_worker(shm_name, slot_size, requests, results, hands_kwargs):
+    """worker process: read frames from the shared ring, run MediaPipe Hands, send landmarks back"""
+    import mediapipe as mp
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    hands = mp.solutions.hands.Hands(**hands_kwargs)
+    try:
+        while True:
+            request = requests.get()
+            if request is None:
+                break
+            ticket, slot, shape = request
+
+            image = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=slot * slot_size)
+            image_rgb = cv.cvtColor(image, cv.COLOR_BGR2RGB)
+            output = hands.process(image_rgb)
+
+            landmarks = None
+            handedness = None
+            if output.multi_hand_landmarks is not None:
+                landmarks = np.array([[(lm.x, lm.y, lm.z) for lm in hand.landmark]
+                                      for hand in output.multi_hand_landmarks], dtype=np.float32)
+                handedness = [h.classification[0].label for h in output.multi_handedness]
+            results.send((ticket, slot, landmarks, handedness))
+    finally:
+        image = None
+        hands.close()
+        shm.close()
+        results.close()
+
+
+class LandmarkWorkerPool(object):
+    """
+    run MediaPipe hand landmarking in worker processes so it does not compete with
+    the web server for the GIL
+
+    workers are started with spawn, which re-imports the parent's __main__ script in
+    each of them: keep the script's heavy setup under if __name__ == '__main__'
+
+    frames are copied into a shared-memory ring of slots instead of being pickled,
+    only the slot index and shape travel over the request queue, and landmarks come
+    back as a small float32 array over the worker's own result pipe, which is
+    replaced with the worker so terminating one cannot corrupt the others' results. the tracking stream (every process() call by
+    default) always goes to worker 0, so MediaPipe's frame-to-frame tracking sees
+    consecutive frames; frames submitted with tracking=False, such as presence probes,
+    go round-robin to the other workers when there are any. a worker that dies or does
+    not answer in time is (re)started and its pending frames are answered with "no hand"
+    """
+
+    def __init__(self, num_workers=1, slots_per_worker=2, result_timeout=2.0, startup_timeout=30.0, **hands_kwargs):
+        self.num_workers = num_workers
+        self.num_slots = num_workers * slots_per_worker
+        self.result_timeout = result_timeout
+        self.startup_timeout = startup_timeout
+        self.hands_kwargs = hands_kwargs
+
+        self._ctx = mp_proc.get_context('spawn')
+        self._shm = None
+        self._slot_size = 0
+        self._free_slots = queue.Queue()
+        self._workers = [None] * num_workers
+        self._requests = [None] * num_workers
+        self._result_conns = [None] * num_workers
+        self._pending = {}
+        self._done = {}
+        self._abandoned = set()
+        self._cond = threading.Condition()
+        self._restart_lock = threading.Lock()
+        self._tickets = itertools.count()
+        self._spare_workers = itertools.cycle(range(1, num_workers)) if num_workers > 1 else None
+        self._collector = None
+        self._running = False
+        # per worker: has it answered since it was started (the first frames wait for MediaPipe to load)
+        self._warm = [False] * num_workers
+
+        self.restarts = 0
+
+    def _allocate(self, slot_size):
+        """(re)create the shared ring for frames of slot_size bytes and start the workers on it"""
+        with self._restart_lock:
+            self._shutdown_workers()
+            with self._cond:
+                for ticket in self._pending:
+                    if ticket not in self._abandoned:
+                        self._done[ticket] = EMPTY_RESULTS
+                self._pending.clear()
+                self._abandoned.clear()
+                self._cond.notify_all()
+            if self._shm is not None:
+                self._shm.close()
+                self._shm.unlink()
+            self._slot_size = slot_size
+            self._shm = shared_memory.SharedMemory(create=True, size=slot_size * self.num_slots)
+            self._free_slots = queue.Queue()
+            for slot in range(self.num_slots):
+                self._free_slots.put(slot)
+            for index in range(self.num_workers):
+                self._start_worker(index)
+
+        if self._collector is None:
+            self._running = True
+            self._collector = threading.Thread(target=self._collect, name='landmark-collector', daemon=True)
+            self._collector.start()
+
+    def _start_worker(self, index):
+        requests = self._ctx.Queue()
+        receiver, sender = self._ctx.Pipe(duplex=False)
+        worker = self._ctx.Process(
+            target=_landmark_worker,
+            args=(self._shm.name, self._slot_size, requests, sender, self.hands_kwargs),
+            name=f'landmark-worker-{index}',
+            daemon=True
+        )
+        worker.start()
+        # only the worker writes; closing our copy lets recv() see EOF when it dies
+        sender.close()
+        self._close_results(index)
+        self._requests[index] = requests
+        self._result_conns[index] = receiver
+        self._workers[index] = worker
+        self._warm[index] = False
+
+    def _close_results(self, index):
+        conn = self._result_conns[index]
+        self._result_conns[index] = None
+        if conn is not None:
+            conn.close()
+
+    def _restart_worker(self, index):
+        """replace worker index (dead or hung); its pending frames are answered with no hand. hold _restart_lock"""
+        worker = self._workers[index]
+        if worker is not None and worker.is_alive():
+            worker.terminate()
+            worker.join(timeout=1.0)
+        self._close_results(index)
+        self.restarts += 1
+        with self._cond:
+            for ticket, (worker_index, slot) in list(self._pending.items()):
+                if worker_index == index:
+                    del self._pending[ticket]
+                    self._free_slots.put(slot)
+                    if ticket in self._abandoned:
+                        self._abandoned.discard(ticket)
+                    else:
+                        self._done[ticket] = EMPTY_RESULTS
+            self._cond.notify_all()
+        self._start_worker(index)
+
+    def _collect(self):
+        while self._running:
+            conns = [conn for conn in self._result_conns if conn is not None]
+            if len(conns) < self.num_workers:
+                # a worker whose pipe hit EOF is restarted once it has fully exited
+                self._check_workers()
+            try:
+                ready = wait_connections(conns, timeout=0.5)
+            except OSError:
+                # a pipe was closed by a restart while waiting on it
+                continue
+            if not ready:
+                self._check_workers()
+                continue
+            for conn in ready:
+                try:
+                    result = conn.recv()
+                except (EOFError, OSError):
+                    # the worker died (EOF), or its pipe was replaced by a restart (closed)
+                    self._drop_results(conn)
+                    self._check_workers()
+                    continue
+                self._on_result(*result)
+
+    def _drop_results(self, conn):
+        with self._restart_lock:
+            if conn in self._result_conns:
+                self._close_results(self._result_conns.index(conn))
+
+    def _on_result(self, ticket, slot, landmarks, handedness):
+        with self._cond:
+            pending = self._pending.pop(ticket, None)
+            if pending is not None:
+                self._warm[pending[0]] = True
+                self._free_slots.put(slot)
+                if ticket in self._abandoned:
+                    self._abandoned.discard(ticket)
+                else:
+                    self._done[ticket] = landmarks_to_results(landmarks, handedness)
+            self._cond.notify_all()
+
+    def _check_workers(self):
+        with self._restart_lock:
+            for index, worker in enumerate(self._workers):
+                if worker is None or worker.is_alive():
+                    continue
+                print(f"[ERROR] Landmark worker {index} exited (code {worker.exitcode}), restarting")
+                self._restart_worker(index)
+
+    def _timeout(self, index=None):
+        # a worker that has not answered yet may still be loading MediaPipe
+        warm = all(self._warm) if index is None else self._warm[index]
+        return self.result_timeout if warm else self.startup_timeout
+
+    def _take_slot(self):
+        while True:
+            try:
+                return self._free_slots.get(timeout=self._timeout())
+            except queue.Empty:
+                # every slot is held by frames no worker has answered: treat their workers as hung
+                with self._restart_lock:
+                    with self._cond:
+                        busy = {worker_index for worker_index, _ in self._pending.values()}
+                    for index in sorted(busy):
+                        print(f"[ERROR] Landmark worker {index} timed out, restarting")
+                        self._restart_worker(index)
+
+    def reserve(self, nbytes):
+        """
+        make every slot hold frames of up to nbytes; call with the largest frame the caller
+        will send before streaming, since growing the ring restarts the workers
+        """
+        if nbytes > self._slot_size:
+            self._allocate(nbytes)
+
+    def submit(self, image, tracking=True):
+        """
+        copy image into a free slot and queue it for a worker; returns a ticket for result()
+
+        tracking frames go to worker 0, other frames to the spare workers (worker 0 if there are none)
+        """
+        if image.nbytes > self._slot_size:
+            if self._shm is not None:
+                print(f"[INFO] Frame of {image.nbytes} bytes exceeds the landmark worker slots, reallocating")
+            self._allocate(image.nbytes)
+
+        slot = self._take_slot()
+        view = np.ndarray(image.shape, dtype=np.uint8, buffer=self._shm.buf, offset=slot * self._slot_size)
+        np.copyto(view, image)
+
+        ticket = next(self._tickets)
+        worker_index = 0 if tracking or self._spare_workers is None else next(self._spare_workers)
+        with self._cond:
+            self._pending[ticket] = (worker_index, slot)
+        self._requests[worker_index].put((ticket, slot, image.shape))
+        return ticket
+
+    def result(self, ticket, timeout=None):
+        with self._cond:
+            pending = self._pending.get(ticket)
+            if timeout is None:
+                timeout = self._timeout(pending[0] if pending is not None else None)
+            if self._cond.wait_for(lambda: ticket in self._done, timeout):
+                return self._done.pop(ticket)
+            # restarting the worker releases the slot; a late answer from the old one is ignored
+            self._abandoned.add(ticket)
+        with self._restart_lock:
+            with self._cond:
+                pending = self._pending.get(ticket)
+            if pending is not None:
+                print(f"[ERROR] Landmark worker {pending[0]} timed out, restarting")
+                self._restart_worker(pending[0])
+        with self._cond:
+            self._abandoned.discard(ticket)
+            return self._done.pop(ticket, EMPTY_RESULTS)
+
+    def process(self, image, tracking=True):
+        """Hands.process() equivalent for a BGR frame; tracking=False keeps it off the tracking worker"""
+        return self.result(self.submit(image, tracking))
+
+    def _shutdown_workers(self):
+        for index, worker in enumerate(self._workers):
+            if worker is None:
+                continue
+            self._requests[index].put(None)
+            worker.join(timeout=1.0)
+            if worker.is_alive():
+                worker.terminate()
+            self._workers[index] = None
+            self._close_results(index)
+
+    def close(self):
+        self._running = False
+        self._shutdown_workers()
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
@@ -0,0 +1,104 @@
+import cv2 as cv
+import numpy as np
+
+
+class LandmarkFlowTracker(object):
+    """
+    carry the 21 hand landmarks from one MediaPipe keyframe to the next with
+    pyramidal Lucas-Kanade optical flow
+
+    the keyframe cadence adapts to how fast the hand moves: up to max_interval
+    frames between keyframes while the hand is slow, every frame when it moves
+    faster than fast_motion pixels per frame. a keyframe is also forced as soon as
+    too few landmarks are tracked or their flow error gets high
+    """
+
+    def __init__(self, max_interval=3, slow_motion=4.0, fast_motion=16.0, min_tracked=0.8, max_error=30.0,
+                 win_size=(21, 21), max_level=3):
+        self.max_interval = max_interval
+        self.slow_motion = slow_motion
+        self.fast_motion = fast_motion
+        self.min_tracked = min_tracked
+        self.max_error = max_error
+        self.lk_params = dict(
+            winSize=win_size,
+            maxLevel=max_level,
+            criteria=(cv.TERM_CRITERIA_EPS | cv.TERM_CRITERIA_COUNT, 20, 0.03)
+        )
+
+        self.interval = max_interval
+        self._gray = None
+        self._points = None
+        self._since_keyframe = 0
+
+        self.keyframes = 0
+        self.propagated = 0
+        self.lost = 0
+
+    @property
+    def tracking(self):
+        return self._points is not None
+
+    def due(self):
+        """True if the next frame should run the full MediaPipe graph (one keyframe every interval frames)"""
+        return self._points is None or self._since_keyframe >= self.interval - 1
+
+    def clear(self):
+        self._gray = None
+        self._points = None
+        self._since_keyframe = 0
+        self.interval = self.max_interval
+
+    def keyframe(self, gray, points):
+        """start propagating from MediaPipe landmarks: (21, 3) array of pixel x, pixel y and z"""
+        if self._points is not None:
+            # _points are already on the previous frame (keyframe or propagated), so this is one frame of motion;
+            # adapting on every keyframe lets the interval grow back once the hand slows down
+            self._adapt(float(np.median(np.linalg.norm(points[:, :2] - self._points[:, :2], axis=1))))
+        self._gray = gray
+        self._points = points.astype(np.float32)
+        self._since_keyframe = 0
+        self.keyframes += 1
+
+    def propagate(self, gray):
+        """move the landmarks onto gray; returns the (21, 3) landmarks or None when tracking is lost"""
+        if self._points is None:
+            return None
+
+        previous = np.ascontiguousarray(self._points[:, :2]).reshape(-1, 1, 2)
+        moved, status, error = cv.calcOpticalFlowPyrLK(self._gray, gray, previous, None, **self.lk_params)
+        good = (status.reshape(-1) == 1) & (error.reshape(-1) < self.max_error)
+        if good.mean() < self.min_tracked:
+            self.lost += 1
+            self.clear()
+            return None
+
+        moved = moved.reshape(-1, 2)
+        displacement = moved - self._points[:, :2]
+        # landmarks LK lost follow the hand's median motion
+        shift = np.median(displacement[good], axis=0)
+        moved[~good] = self._points[~good, :2] + shift
+
+        self._adapt(float(np.median(np.linalg.norm(displacement[good], axis=1))))
+        self._points = np.column_stack((moved, self._points[:, 2])).astype(np.float32)
+        self._gray = gray
+        self._since_keyframe += 1
+        self.propagated += 1
+        return self._points
+
+    def _adapt(self, speed):
+        """pick the keyframe interval from the hand speed in pixels per frame"""
+        if speed <= self.slow_motion:
+            self.interval = self.max_interval
+        elif speed >= self.fast_motion:
+            self.interval = 1
+        else:
+            fraction = (self.fast_motion - speed) / (self.fast_motion - self.slow_motion)
+            self.interval = max(1, int(round(1 + fraction * (self.max_interval - 1))))
+
+    def normalized(self, width, height):
+        """current landmarks in MediaPipe's normalized coordinates"""
+        points = self._points.copy()
+        points[:, 0] /= width
+        points[:, 1] /= height
+        return points
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import cv2 as cv
+import mediapipe as mp
+from mediapipe.tasks import python as mp_tasks
+from mediapipe.tasks.python import vision
+
+from src.hand_gesture.inference_pool import EMPTY_RESULTS, HandLandmarks, LandmarkResults, NormalizedLandmark
+
+
+def tasks_to_results(result):
+    """map a HandLandmarkerResult onto the Hands.process()-like result the rest of HandTracker reads"""
+    if not result.hand_landmarks:
+        return EMPTY_RESULTS
+    hands = [HandLandmarks([NormalizedLandmark(lm.x, lm.y, lm.z) for lm in hand]) for hand in result.hand_landmarks]
+    handedness = [categories[0].category_name for categories in result.handedness]
+    return LandmarkResults(hands, handedness)
+
+
+class LiveStreamLandmarker(object):
+    """
+    MediaPipe Tasks HandLandmarker in LIVE_STREAM mode
+
+    frames are submitted with a timestamp and results arrive on MediaPipe's own
+    thread through a callback, so process() never waits for inference: it returns
+    the newest finished result, normally the one of the previous frame. frames
+    submitted while the graph is busy are dropped by MediaPipe
+    """
+
+    def __init__(self, model_path, num_hands=1, min_detection_confidence=0.7, min_presence_confidence=0.5,
+                 min_tracking_confidence=0.5):
+        options = vision.HandLandmarkerOptions(
+            base_options=mp_tasks.BaseOptions(model_asset_path=model_path),
+            running_mode=vision.RunningMode.LIVE_STREAM,
+            num_hands=num_hands,
+            min_hand_detection_confidence=min_detection_confidence,
+            min_hand_presence_confidence=min_presence_confidence,
+            min_tracking_confidence=min_tracking_confidence,
+            result_callback=self._on_result
+        )
+        self._landmarker = vision.HandLandmarker.create_from_options(options)
+        self._cond = threading.Condition()
+        self._latest = EMPTY_RESULTS
+        self._latest_timestamp = -1
+        self._last_submitted = -1
+
+        self.submitted = 0
+        self.completed = 0
+
+    def _on_result(self, result, output_image, timestamp_ms):
+        results = tasks_to_results(result)
+        with self._cond:
+            self._latest = results
+            self._latest_timestamp = timestamp_ms
+            self.completed += 1
+            self._cond.notify_all()
+
+    def submit(self, image):
+        """queue a BGR frame; returns its timestamp in ms"""
+        # LIVE_STREAM needs strictly increasing timestamps
+        timestamp_ms = max(int(time.monotonic() * 1000), self._last_submitted + 1)
+        self._last_submitted = timestamp_ms
+        image_rgb = cv.cvtColor(image, cv.COLOR_BGR2RGB)
+        self._landmarker.detect_async(mp.Image(image_format=mp.ImageFormat.SRGB, data=image_rgb), timestamp_ms)
+        self.submitted += 1
+        return timestamp_ms
+
+    def process(self, image, timeout=0.0):
+        """submit image and return the newest result; with a timeout, wait up to that long for this frame's result"""
+        timestamp_ms = self.submit(image)
+        with self._cond:
+            if timeout > 0:
+                self._cond.wait_for(lambda: self._latest_timestamp >= timestamp_ms, timeout)
+            return self._latest
+
+    def close(self):
+        self._landmarker.close()
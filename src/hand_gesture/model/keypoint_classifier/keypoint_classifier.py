@@ -24,7 +24,8 @@ class KeyPointClassifier(object):
         input_details_tensor_index = self.input_details[0]['index']
         self.interpreter.set_tensor(
             input_details_tensor_index,
-            np.array([landmark_list], dtype=np.float32))
+            # a preprocessed float32 buffer is passed through as a view, lists are converted
+            np.asarray(landmark_list, dtype=np.float32).reshape(1, -1))
         self.interpreter.invoke()
 
         output_details_tensor_index = self.output_details[0]['index']
@@ -0,0 +1,50 @@
+import numpy as np
+
+
+class PointHistory(object):
+    """
+    fixed-size ring buffer of fingertip points, oldest first
+
+    drop-in for the deque(maxlen=length) of [x, y] lists: every point is written
+    twice, at head and head + length, into a (2 * length, 2) int32 array, so the
+    ordered history is always the contiguous slice starting at head and points()
+    is a view, not a copy. (0, 0) marks a frame without a pointing finger
+    """
+
+    def __init__(self, length):
+        self.length = length
+        self._buffer = np.zeros((2 * length, 2), dtype=np.int32)
+        self._head = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, point):
+        x, y = int(point[0]), int(point[1])
+
+        if self._size == self.length:
+            slot = self._head
+            self._head = (self._head + 1) % self.length
+        else:
+            slot = self._size
+            self._size += 1
+
+        self._buffer[slot] = x, y
+        self._buffer[slot + self.length] = x, y
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
+
+    @property
+    def full(self):
+        return self._size == self.length
+
+    def points(self):
+        """(len, 2) int32 view of the history, oldest first; only valid until the next append"""
+        return self._buffer[self._head:self._head + self._size]
+
+    def snapshot(self):
+        """a copy of points() that stays valid, e.g. for drawing on another thread"""
+        return self.points().copy()
@@ -1,52 +1,49 @@
 import autorootcwd
-import copy
-import itertools
+import numpy as np
 
-def pre_process_landmark(landmark_list):
-    temp_landmark_list = copy.deepcopy(landmark_list)
+def pre_process_landmark(landmark_list, out=None):
+    """
+    landmarks relative to the wrist and scaled by the largest offset, flattened to float32
 
-    # Convert to relative coordinates
-    base_x, base_y = 0, 0
-    for index, landmark_point in enumerate(temp_landmark_list):
-        if index == 0:
-            base_x, base_y = landmark_point[0], landmark_point[1]
-
-        temp_landmark_list[index][0] = temp_landmark_list[index][0] - base_x
-        temp_landmark_list[index][1] = temp_landmark_list[index][1] - base_y
+    out, if given, is a preallocated float32 buffer of 2 * len(landmark_list) values
+    (e.g. the (1, 42) classifier input) that is filled in place; a flat view of it is returned
+    """
+    landmark_array = np.asarray(landmark_list)
+    if out is None:
+        out = np.empty((1, landmark_array.size), dtype=np.float32)
+    points = out.reshape(-1, 2)
 
-    # Convert to a one-dimensional list
-    temp_landmark_list = list(
-        itertools.chain.from_iterable(temp_landmark_list))
+    # Convert to relative coordinates
+    np.subtract(landmark_array, landmark_array[0], out=points)
 
     # Normalization
-    max_value = max(list(map(abs, temp_landmark_list)))
-
-    def normalize_(n):
-        return n / max_value
+    max_value = max(points.max(), -points.min())
+    if max_value > 0:
+        points /= max_value
 
-    temp_landmark_list = list(map(normalize_, temp_landmark_list))
+    return out.reshape(-1)
 
-    return temp_landmark_list
 
+def pre_process_point_history(image, point_history, out=None):
+    """
+    point history relative to its first point, in image-size units, flattened to float32
 
-def pre_process_point_history(image, point_history):
+    out, if given, is a preallocated float32 buffer of at least 2 * len(point_history)
+    values; the filled prefix is returned
+    """
     image_width, image_height = image.shape[1], image.shape[0]
 
-    temp_point_history = copy.deepcopy(point_history)
+    history_array = np.asarray(point_history)
+    if out is None:
+        out = np.empty((1, history_array.size), dtype=np.float32)
+    out = out.reshape(-1)[:history_array.size]
+    if history_array.size == 0:
+        return out
 
-    # Convert to relative coordinates
-    base_x, base_y = 0, 0
-    for index, point in enumerate(temp_point_history):
-        if index == 0:
-            base_x, base_y = point[0], point[1]
-
-        temp_point_history[index][0] = (temp_point_history[index][0] -
-                                        base_x) / image_width
-        temp_point_history[index][1] = (temp_point_history[index][1] -
-                                        base_y) / image_height
+    points = out.reshape(-1, 2)
 
-    # Convert to a one-dimensional list
-    temp_point_history = list(
-        itertools.chain.from_iterable(temp_point_history))
+    # Convert to relative coordinates
+    np.subtract(history_array, history_array[0], out=points)
+    points /= (image_width, image_height)
 
-    return temp_point_history
\ No newline at end of file
+    return out
@@ -2,37 +2,33 @@ import autorootcwd
 import cv2 as cv
 import numpy as np
 
-def calc_bounding_rect(image, landmarks):
+def calc_landmark_array(image, landmarks):
+    """
+    pixel coordinates of the 21 landmarks as one (21, 2) int32 array
+
+    converted in a single vectorized pass; bounding rect, drawing, classification
+    and find_nearest_tomato all read this array. a new array per frame, since the
+    detection is drawn on another thread while the next frame is processed
+    """
     image_width, image_height = image.shape[1], image.shape[0]
 
-    landmark_array = np.empty((0, 2), int)
-
-    for _, landmark in enumerate(landmarks.landmark):
-        landmark_x = min(int(landmark.x * image_width), image_width - 1)
-        landmark_y = min(int(landmark.y * image_height), image_height - 1)
-
-        landmark_point = [np.array((landmark_x, landmark_y))]
+    normalized = np.fromiter((value for landmark in landmarks.landmark for value in (landmark.x, landmark.y)),
+                             dtype=np.float64, count=2 * len(landmarks.landmark)).reshape(-1, 2)
+    landmark_array = (normalized * (image_width, image_height)).astype(np.int32)
+    np.minimum(landmark_array, (image_width - 1, image_height - 1), out=landmark_array)
 
-        landmark_array = np.append(landmark_array, landmark_point, axis=0)
+    return landmark_array
 
+def landmark_bounding_rect(landmark_array):
     x, y, w, h = cv.boundingRect(landmark_array)
 
     return [x, y, x + w, y + h]
 
-def calc_landmark_list(image, landmarks):
-    image_width, image_height = image.shape[1], image.shape[0]
-
-    landmark_point = []
-
-    # Keypoint
-    for _, landmark in enumerate(landmarks.landmark):
-        landmark_x = min(int(landmark.x * image_width), image_width - 1)
-        landmark_y = min(int(landmark.y * image_height), image_height - 1)
-        # landmark_z = landmark.z
-
-        landmark_point.append([landmark_x, landmark_y])
+def calc_bounding_rect(image, landmarks):
+    return landmark_bounding_rect(calc_landmark_array(image, landmarks))
 
-    return landmark_point
+def calc_landmark_list(image, landmarks):
+    return calc_landmark_array(image, landmarks).tolist()
 
 def draw_landmarks(image, landmark_point):
     if len(landmark_point) > 0:
@@ -253,10 +249,12 @@ def draw_info_text(image, brect, handedness, hand_sign_text,
 
 
 def draw_point_history(image, point_history):
-    for index, point in enumerate(point_history):
-        if point[0] != 0 and point[1] != 0:
-            cv.circle(image, (point[0], point[1]), 1 + int(index / 2),
-                      (152, 251, 152), 2)
+    point_history = np.asarray(point_history, dtype=np.int32).reshape(-1, 2)
+    # (0, 0) entries are frames without a pointing finger
+    valid = np.flatnonzero((point_history[:, 0] != 0) & (point_history[:, 1] != 0))
+    for index, (x, y) in zip(valid.tolist(), point_history[valid].tolist()):
+        cv.circle(image, (x, y), 1 + int(index / 2),
+                  (152, 251, 152), 2)
 
     return image
 
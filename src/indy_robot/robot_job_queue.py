@@ -0,0 +1,165 @@
+import itertools
+import queue
+import threading
+import time
+
+from src.indy_robot.robot_sequence_controller import SequenceCancelled
+
+JOB_QUEUED = 'queued'
+JOB_STARTED = 'started'
+JOB_PROGRESS = 'progress'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+
+ACTIVE_STATES = (JOB_QUEUED, JOB_STARTED, JOB_PROGRESS)
+
+
+class RobotJob(object):
+    """one requested sequence run and its progress"""
+
+    def __init__(self, job_id, sequence_number):
+        self.job_id = job_id
+        self.sequence_number = sequence_number
+        self.status = JOB_QUEUED
+        self.step = 0
+        self.total_steps = None
+        self.command = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def active(self):
+        return self.status in ACTIVE_STATES
+
+    def to_dict(self):
+        return {
+            'job_id': self.job_id,
+            'tomato_id': self.sequence_number,
+            'status': self.status,
+            'step': self.step,
+            'total_steps': self.total_steps,
+            'command': self.command,
+            'error': self.error
+        }
+
+
+class RobotJobQueue(object):
+    """
+    run robot sequences on a dedicated executor thread
+
+    submit() returns at once with a job id; the job's life cycle (queued, started,
+    progress per command, completed / failed / cancelled) is reported to listener(job)
+    from the executor thread. there is one robot, so a submission is rejected while any
+    job is still queued or running, and jobs can be cancelled while queued or between commands
+    """
+
+    def __init__(self, controller, listener=None, history=20):
+        self.controller = controller
+        self.listener = listener
+        self.history = history
+
+        self.jobs = {}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._thread = None
+        self.current = None
+
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='robot-executor', daemon=True)
+            self._thread.start()
+
+    def _notify(self, job):
+        if self.listener is None:
+            return
+        try:
+            self.listener(job)
+        except Exception as e:
+            print(f"[ERROR] Robot job listener failed: {e}")
+
+    def submit(self, sequence_number):
+        """queue a sequence; returns (job, None) or (None, reason) if it was rejected"""
+        with self._lock:
+            for job in self.jobs.values():
+                if job.active:
+                    return None, f"robot busy with job {job.job_id} (sequence {job.sequence_number}, {job.status})"
+            job = RobotJob(next(self._ids), sequence_number)
+            self.jobs[job.job_id] = job
+            self._prune()
+            self._start()
+        self._queue.put(job)
+        self._notify(job)
+        return job, None
+
+    def cancel(self, job_id):
+        """cancel a queued or running job; returns False if it is unknown or already finished"""
+        job = self.jobs.get(job_id)
+        if job is None or not job.active:
+            return False
+        job.cancel_event.set()
+        if job.status == JOB_QUEUED:
+            self._finish(job, JOB_CANCELLED)
+        return True
+
+    def busy(self):
+        with self._lock:
+            return any(job.active for job in self.jobs.values())
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job_id]
+
+    def _finish(self, job, status, error=None):
+        with self._lock:
+            if not job.active:
+                return
+            job.status = status
+            job.error = error
+            job.finished_at = time.time()
+        self._notify(job)
+
+    def _on_command(self, job, index, total, cmd_type):
+        job.status = JOB_PROGRESS
+        job.step = index + 1
+        job.total_steps = total
+        job.command = cmd_type
+        self._notify(job)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            if not job.active:
+                continue
+
+            self.current = job
+            job.status = JOB_STARTED
+            self._notify(job)
+            try:
+                success = self.controller.execute_sequence(
+                    job.sequence_number,
+                    on_command=lambda index, total, cmd_type: self._on_command(job, index, total, cmd_type),
+                    cancel_event=job.cancel_event
+                )
+                if success:
+                    self._finish(job, JOB_COMPLETED)
+                else:
+                    self._finish(job, JOB_FAILED, "sequence reported failure")
+            except SequenceCancelled:
+                self._finish(job, JOB_CANCELLED)
+            except Exception as e:
+                print(f"[ERROR] Failed to execute robot sequence: {e}")
+                self._finish(job, JOB_FAILED, str(e))
+            finally:
+                self.current = None
+
+    def stop(self):
+        if self.current is not None:
+            self.current.cancel_event.set()
+        self._queue.put(None)
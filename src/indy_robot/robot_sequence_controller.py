@@ -5,6 +5,10 @@ import re
 from src.indy_robot.Dxl_controller import DynamixelController
 from src.indy_robot.indy_utils import indydcp_client as client
 
+class SequenceCancelled(Exception):
+    """raised by execute_sequence when its cancel event is set"""
+    pass
+
 class RobotSequenceController:
     def __init__(self, robot_ip="192.168.0.2", robot_name="NRMK-Indy7", wp_dir="src/indy_robot/WP_Lab_V2"):
         self.robot_ip = robot_ip
@@ -12,6 +16,7 @@ class RobotSequenceController:
         self.wp_dir = wp_dir
         self.indy = None
         self.dxl = None
+        self._cancel_event = None
         
     def connect(self):
         """connect to robot and gripper"""
@@ -43,8 +48,14 @@ class RobotSequenceController:
                 
         return sequence_dict
         
-    def execute_sequence(self, sequence_number):
-        """execute specific sequence"""
+    def execute_sequence(self, sequence_number, on_command=None, cancel_event=None):
+        """
+        execute specific sequence
+
+        on_command(index, total, cmd_type) is called before each command; setting
+        cancel_event stops the sequence between commands (and during Sleep) with SequenceCancelled
+        """
+        self._cancel_event = cancel_event
         sequence_dict = self.get_sequence_files()
         print(sequence_dict)
         
@@ -63,8 +74,13 @@ class RobotSequenceController:
             
         print(f"Executing sequence {sequence_number}")
         
-        for command in script_data["Program"]:
+        program = script_data["Program"]
+        for index, command in enumerate(program):
             cmd_type = command["cmd"]
+            if cancel_event is not None and cancel_event.is_set():
+                raise SequenceCancelled(f"Sequence {sequence_number} cancelled")
+            if on_command is not None:
+                on_command(index, len(program), cmd_type)
             
             if cmd_type == "MoveJ":
                 self._execute_movej(command["waypoints"])
@@ -123,4 +139,7 @@ class RobotSequenceController:
     def _execute_sleep(self, sleep_time):
         """execute Sleep command"""
         print(f"Waiting for {sleep_time} seconds...")
-        time.sleep(sleep_time) 
\ No newline at end of file
+        if self._cancel_event is None:
+            time.sleep(sleep_time)
+        elif self._cancel_event.wait(sleep_time):
+            raise SequenceCancelled("Sequence cancelled during Sleep") 
\ No newline at end of file
@@ -0,0 +1,14 @@
+from src.streaming.frame_grabber import LatestFrameGrabber, GrabbedFrame
+from src.streaming.video_source import VideoSource, CameraSource, VideoFileSource, ImageDirectorySource, ArraySource, open_video_source
+from src.streaming.adaptive_stream import AdaptiveStreamController, StreamLevel, STREAM_LEVELS, STREAM_TIERS
+from src.streaming.frame_cache import FrameEncodeCache, TieredEncoder, EncodedFrame, encode_jpeg
+from src.streaming.frame_transport import FrameBroadcaster, tier_encode_key, FRAME_HEADER, pack_frame, unpack_frame, monotonic_to_epoch_ms
+from src.streaming.static_frame import StaticFrameEmitter
+from src.streaming.view_transform import ViewTransform, load_calibration
+from src.streaming.frame_scheduler import FrameScheduler
+from src.streaming.mjpeg import mjpeg_stream, MJPEG_MIMETYPE
+from src.streaming.pipeline import Pipeline, PipelineStage, PIPELINE_END
+from src.streaming.event_coalescer import EventCoalescer
+from src.streaming.metrics import MetricsRegistry, LatencyHistogram, timed
+from src.streaming.glass_to_glass import GlassToGlassTracker, ClockOffsetEstimator
+from src.streaming.motion_gate import MotionGate
\ No newline at end of file
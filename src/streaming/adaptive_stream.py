@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+
+StreamLevel = namedtuple('StreamLevel', ['quality', 'scale', 'fps'])
+
+# best to worst; the controller moves one level at a time
+STREAM_LEVELS = (
+    StreamLevel(90, 1.0, 30),
+    StreamLevel(80, 1.0, 30),
+    StreamLevel(70, 1.0, 24),
+    StreamLevel(60, 0.75, 20),
+    StreamLevel(50, 0.75, 15),
+    StreamLevel(40, 0.5, 12),
+    StreamLevel(30, 0.5, 8),
+)
+
+# viewer tiers: index of the best level in STREAM_LEVELS a subscriber of the tier may receive
+STREAM_TIERS = {
+    'full': 0,
+    'medium': 3,
+    'low': 5,
+}
+DEFAULT_TIER = 'full'
+
+
+class AdaptiveStreamController(object):
+    """
+    per-client flow control for the video stream
+
+    keeps a window of unacknowledged frames and walks STREAM_LEVELS down when the
+    acknowledged latency exceeds the target (or frames are lost) and back up when
+    there is headroom
+    """
+
+    def __init__(self, target_latency=0.2, max_in_flight=2, ack_timeout=1.0,
+                 levels=STREAM_LEVELS, start_level=1, best_level=0, bitrate_window=2.0):
+        self.target_latency = target_latency
+        self.max_in_flight = max_in_flight
+        self.ack_timeout = ack_timeout
+        self.levels = levels
+        self.best_level = min(best_level, len(levels) - 1)
+        self.level_index = min(max(start_level, self.best_level), len(levels) - 1)
+        self.bitrate_window = bitrate_window
+
+        self._lock = threading.Lock()
+        self._in_flight = OrderedDict()
+        self._acked_bytes = deque()
+        self._last_sent = None
+        self._last_change = 0.0
+        self._good_acks = 0
+
+        self.latency = None
+        self.frames_sent = 0
+        self.frames_acked = 0
+        # frames not sent: above the current level's fps, or with the in-flight window full
+        self.frames_rate_limited = 0
+        self.frames_skipped = 0
+        self.frames_lost = 0
+        self.bytes_sent = 0
+
+    @property
+    def level(self):
+        return self.levels[self.level_index]
+
+    def set_best_level(self, best_level):
+        """cap the level the controller may climb to (used when a client changes tier)"""
+        with self._lock:
+            self.best_level = min(best_level, len(self.levels) - 1)
+            self.level_index = max(self.level_index, self.best_level)
+
+    def should_send(self, now=None):
+        """true if a new frame may be sent now; counts the frame as rate limited or skipped otherwise"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._expire(now)
+
+            min_interval = 1.0 / self.level.fps
+            if self._last_sent is not None and now - self._last_sent < min_interval * 0.9:
+                self.frames_rate_limited += 1
+                return False
+            if len(self._in_flight) >= self.max_in_flight:
+                self.frames_skipped += 1
+                return False
+            return True
+
+    def on_sent(self, frame_id, nbytes, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._in_flight[frame_id] = (now, nbytes)
+            self._last_sent = now
+            self.frames_sent += 1
+            self.bytes_sent += nbytes
+
+    def on_ack(self, frame_id, now=None):
+        """cumulative acknowledgement: every in-flight frame up to frame_id has been handled"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            acked = [fid for fid in self._in_flight if fid <= frame_id]
+            if not acked:
+                return None
+
+            for fid in acked:
+                sent_time, nbytes = self._in_flight.pop(fid)
+                self._acked_bytes.append((now, nbytes))
+                self.frames_acked += 1
+
+            rtt = now - sent_time
+            self.latency = rtt if self.latency is None else 0.8 * self.latency + 0.2 * rtt
+            self._adjust(now)
+            return rtt
+
+    def _expire(self, now):
+        expired = [fid for fid, (sent_time, _) in self._in_flight.items() if now - sent_time > self.ack_timeout]
+        for fid in expired:
+            del self._in_flight[fid]
+            self.frames_lost += 1
+        if expired:
+            self._step(now, +1)
+
+    def _adjust(self, now):
+        if self.latency > self.target_latency * 1.2:
+            self._good_acks = 0
+            self._step(now, +1, cooldown=0.5)
+        elif self.latency < self.target_latency * 0.7:
+            self._good_acks += 1
+            if self._good_acks >= 30:
+                self._good_acks = 0
+                self._step(now, -1, cooldown=2.0)
+        else:
+            self._good_acks = 0
+
+    def _step(self, now, direction, cooldown=0.5):
+        if now - self._last_change < cooldown:
+            return
+        new_index = min(max(self.level_index + direction, self.best_level), len(self.levels) - 1)
+        if new_index != self.level_index:
+            self.level_index = new_index
+            self._last_change = now
+
+    def bitrate(self, now=None):
+        """effective (acknowledged) bitrate in bits per second"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            while self._acked_bytes and now - self._acked_bytes[0][0] > self.bitrate_window:
+                self._acked_bytes.popleft()
+            return sum(nbytes for _, nbytes in self._acked_bytes) * 8 / self.bitrate_window
+
+    def stats(self):
+        level = self.level
+        return {
+            'quality': level.quality,
+            'scale': level.scale,
+            'fps': level.fps,
+            'latency_ms': None if self.latency is None else round(self.latency * 1000.0, 1),
+            'in_flight': len(self._in_flight),
+            'bitrate_kbps': round(self.bitrate() / 1000.0, 1),
+            'frames_sent': self.frames_sent,
+            'frames_acked': self.frames_acked,
+            'frames_rate_limited': self.frames_rate_limited,
+            'frames_skipped': self.frames_skipped,
+            'frames_lost': self.frames_lost,
+            'bytes_sent': self.bytes_sent
+        }
@@ -0,0 +1,72 @@
+import threading
+import time
+
+
+class EventCoalescer(object):
+    """
+    emit state events (tomato_match_result, segment_status, ...) only when the state changes
+
+    fields listed in progress_fields (e.g. selection_time) do not count as a change; while
+    the rest of the state stays the same they are sent at most every progress_interval.
+    the last state sent to each client is remembered so a client that (re)connects can be
+    brought up to date straight away
+    """
+
+    def __init__(self, socketio, progress_interval=0.1, progress_fields=('selection_time',), namespace='/'):
+        self.socketio = socketio
+        self.progress_interval = progress_interval
+        self.progress_fields = progress_fields
+        self.namespace = namespace
+
+        self._lock = threading.Lock()
+        self._current = {}
+        self._last_emit = {}
+        self._client_state = {}
+
+        self.emitted = 0
+        self.suppressed = 0
+
+    def _key(self, state):
+        return tuple(sorted((k, v) for k, v in state.items() if k not in self.progress_fields))
+
+    def update(self, event, state, now=None):
+        """record the new state of event and emit it if it changed (or if progress is due)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            previous = self._current.get(event)
+            if previous is not None and self._key(previous) == self._key(state):
+                if state == previous or now - self._last_emit.get(event, 0.0) < self.progress_interval:
+                    self._current[event] = state
+                    self.suppressed += 1
+                    return False
+
+            self._current[event] = state
+            self._last_emit[event] = now
+            for client_state in self._client_state.values():
+                client_state[event] = state
+            self.emitted += 1
+
+        self.socketio.emit(event, state, namespace=self.namespace)
+        return True
+
+    def current(self, event):
+        return self._current.get(event)
+
+    def sync_client(self, sid):
+        """send sid every current state it has not seen yet"""
+        with self._lock:
+            client_state = self._client_state.setdefault(sid, {})
+            missing = [(event, state) for event, state in self._current.items() if client_state.get(event) != state]
+            for event, state in missing:
+                client_state[event] = state
+
+        for event, state in missing:
+            self.socketio.emit(event, state, to=sid, namespace=self.namespace)
+        return len(missing)
+
+    def remove_client(self, sid):
+        with self._lock:
+            self._client_state.pop(sid, None)
+
+    def stats(self):
+        return {'emitted': self.emitted, 'suppressed': self.suppressed}
@@ -0,0 +1,102 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2 as cv
+
+from src.streaming.metrics import timed
+
+
+def encode_jpeg(image, quality, scale=1.0):
+    """encode image as JPEG, downscaled by scale; returns (buffer, width, height)"""
+    if scale != 1.0:
+        height, width = image.shape[:2]
+        image = cv.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv.INTER_AREA)
+    _, buffer = cv.imencode('.jpg', image, [cv.IMWRITE_JPEG_QUALITY, quality])
+    height, width = image.shape[:2]
+    return buffer, width, height
+
+
+class EncodedFrame(object):
+    """one frame encoded at one (quality, scale)"""
+
+    def __init__(self, jpeg, width, height, frame_id, timestamp_ms):
+        self.jpeg = jpeg
+        self.width = width
+        self.height = height
+        self.frame_id = frame_id
+        self.timestamp_ms = timestamp_ms
+
+
+class FrameEncodeCache(object):
+    """encodings of a single frame; each (quality, scale) is encoded at most once and only when requested"""
+
+    def __init__(self, executor, image, frame_id, timestamp_ms, metrics=None):
+        self.executor = executor
+        self.metrics = metrics
+        self.image = image
+        self.frame_id = frame_id
+        self.timestamp_ms = timestamp_ms
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _encode(self, quality, scale):
+        with timed(self.metrics, 'imencode'):
+            jpeg, width, height = encode_jpeg(self.image, quality, scale)
+        return EncodedFrame(jpeg, width, height, self.frame_id, self.timestamp_ms)
+
+    def request(self, quality, scale=1.0):
+        """start encoding (quality, scale) on the pool if nobody has asked for it yet; returns a future"""
+        key = (quality, scale)
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None:
+                future = self.executor.submit(self._encode, quality, scale)
+                self._futures[key] = future
+            return future
+
+    def get(self, quality, scale=1.0, timeout=None):
+        return self.request(quality, scale).result(timeout)
+
+    @property
+    def encode_count(self):
+        return len(self._futures)
+
+
+class TieredEncoder(object):
+    """owns the encoder pool and the cache of the most recent frame"""
+
+    def __init__(self, max_workers=2, metrics=None):
+        self.metrics = metrics
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='jpeg-encoder')
+        self.latest = None
+        self.frames = 0
+        self.encodes = 0
+        self.viewers = 0
+        self._cond = threading.Condition()
+
+    def new_frame(self, image, frame_id, timestamp_ms):
+        cache = FrameEncodeCache(self.executor, image, frame_id, timestamp_ms, self.metrics)
+        with self._cond:
+            if self.latest is not None:
+                self.encodes += self.latest.encode_count
+            self.latest = cache
+            self.frames += 1
+            self._cond.notify_all()
+        return cache
+
+    def wait_for_frame(self, last=None, timeout=None):
+        """wait until a frame other than last is published; returns the latest cache (last again on timeout)"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.latest is not None and self.latest is not last, timeout)
+            return self.latest
+
+    def add_viewer(self):
+        with self._cond:
+            self.viewers += 1
+
+    def remove_viewer(self):
+        with self._cond:
+            self.viewers -= 1
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import namedtuple
+
+from src.streaming.metrics import timed
+
+GrabbedFrame = namedtuple('GrabbedFrame', ['seq', 'timestamp', 'image', 'dropped'])
+
+
+class LatestFrameGrabber(object):
+    """read frames on a dedicated thread and keep only the most recent one"""
+
+    def __init__(self, capture, metrics=None):
+        self.capture = capture
+        self.metrics = metrics
+
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+        # latest frame slot, overwritten by the capture thread
+        self._image = None
+        self._seq = 0
+        self._timestamp = None
+
+        self._last_read_seq = 0
+        self.failed = False
+        self.frames_dropped = 0
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def frames_captured(self):
+        return self._seq
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='frame-grabber', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+        if self.capture.isOpened():
+            self.capture.release()
+
+    def _run(self):
+        while self._running:
+            with timed(self.metrics, 'capture'):
+                ret, image = self.capture.read()
+            timestamp = time.monotonic()
+
+            with self._cond:
+                if not ret:
+                    self.failed = True
+                    self._running = False
+                    self._cond.notify_all()
+                    break
+
+                self._image = image
+                self._seq += 1
+                self._timestamp = timestamp
+                self._cond.notify_all()
+
+    def read(self, timeout=1.0):
+        """wait for a frame newer than the last one read and return it, or None on timeout/stop"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > self._last_read_seq or not self._running, timeout)
+            if self._seq <= self._last_read_seq:
+                return None
+
+            dropped = self._seq - self._last_read_seq - 1
+            self.frames_dropped += dropped
+            if dropped and self.metrics is not None:
+                self.metrics.inc('frames_dropped', dropped)
+            self._last_read_seq = self._seq
+
+            return GrabbedFrame(self._seq, self._timestamp, self._image, dropped)
@@ -0,0 +1,82 @@
+import time
+
+
+class FrameScheduler(object):
+    """
+    pace the inference stage to a target fps and degrade each stage on its own overruns
+
+    begin_frame() / end_frame() wrap the inference stage: it sleeps only for what is
+    left of each frame's budget and counts deadline misses, and while overruns keep
+    coming every other frame skips inference. drawing happens on the annotate stage's
+    thread, so skipping it cannot shorten an inference frame; that stage reports its
+    own time with end_draw() and skips the overlay on the frame after it overran
+    """
+
+    def __init__(self, target_fps=30.0, skip_inference_after=2):
+        self.target_fps = target_fps
+        self.skip_inference_after = skip_inference_after
+
+        self._frame_start = None
+        self._skipped_last = False
+        self._draw_overrun = False
+        self.overrun_streak = 0
+
+        self.frames = 0
+        self.deadline_misses = 0
+        self.inference_skips = 0
+        self.drawing_skips = 0
+
+    @property
+    def budget(self):
+        return 1.0 / self.target_fps
+
+    def begin_frame(self):
+        self._frame_start = time.monotonic()
+        self.frames += 1
+        return self._frame_start
+
+    def should_draw(self):
+        """called by the drawing stage; after it overran the budget the next overlay is skipped"""
+        if self._draw_overrun:
+            self.drawing_skips += 1
+            return False
+        return True
+
+    def end_draw(self, elapsed):
+        """record the drawing stage's time for one frame (not paced, it only degrades)"""
+        self._draw_overrun = elapsed > self.budget
+
+    def should_run_inference(self):
+        # never skip two frames in a row so tracking keeps up
+        if self.overrun_streak >= self.skip_inference_after and not self._skipped_last:
+            self._skipped_last = True
+            self.inference_skips += 1
+            return False
+        self._skipped_last = False
+        return True
+
+    def end_frame(self):
+        """sleep for the rest of the frame budget; returns the time spent on the frame"""
+        if self._frame_start is None:
+            return 0.0
+        elapsed = time.monotonic() - self._frame_start
+        remaining = self.budget - elapsed
+
+        if remaining < 0:
+            self.deadline_misses += 1
+            self.overrun_streak += 1
+        else:
+            self.overrun_streak = 0
+            time.sleep(remaining)
+
+        self._frame_start = None
+        return elapsed
+
+    def stats(self):
+        return {
+            'target_fps': self.target_fps,
+            'frames': self.frames,
+            'deadline_misses': self.deadline_misses,
+            'inference_skips': self.inference_skips,
+            'drawing_skips': self.drawing_skips
+        }
@@ -0,0 +1,179 @@
+import base64
+import struct
+import threading
+import time
+
+from src.streaming.adaptive_stream import AdaptiveStreamController, STREAM_LEVELS, STREAM_TIERS, DEFAULT_TIER
+from src.streaming.frame_cache import TieredEncoder
+from src.streaming.metrics import timed
+
+# frame_id (uint32), capture timestamp in ms since epoch (float64), width (uint16), height (uint16)
+FRAME_HEADER = struct.Struct('<IdHH')
+
+TRANSPORT_BINARY = 'binary'
+TRANSPORT_BASE64 = 'base64'
+TRANSPORTS = (TRANSPORT_BINARY, TRANSPORT_BASE64)
+
+# clients that do not acknowledge frames get every frame at the original encoder settings
+# (or at the best level of their tier when they subscribed to a smaller one)
+LEGACY_QUALITY = 95
+LEGACY_SCALE = 1.0
+
+
+def tier_encode_key(tier):
+    """(quality, scale) a viewer of tier gets when no adaptive controller is involved"""
+    if tier == DEFAULT_TIER or tier not in STREAM_TIERS:
+        return LEGACY_QUALITY, LEGACY_SCALE
+    level = STREAM_LEVELS[STREAM_TIERS[tier]]
+    return level.quality, level.scale
+
+
+def monotonic_to_epoch_ms(timestamp):
+    """convert a time.monotonic() timestamp to milliseconds since epoch"""
+    return (time.time() - (time.monotonic() - timestamp)) * 1000.0
+
+
+def pack_frame(jpeg, frame_id, timestamp_ms, width, height):
+    """prepend the fixed frame header to the encoded JPEG bytes"""
+    header = FRAME_HEADER.pack(frame_id & 0xFFFFFFFF, timestamp_ms, width, height)
+    return b''.join((header, memoryview(jpeg)))
+
+
+def unpack_frame(payload):
+    """split a packed frame into (frame_id, timestamp_ms, width, height) and the JPEG bytes"""
+    return FRAME_HEADER.unpack_from(payload), payload[FRAME_HEADER.size:]
+
+
+def build_payload(transport, jpeg, frame_id, timestamp_ms, width, height):
+    if transport == TRANSPORT_BINARY:
+        return 'video_frame_bin', pack_frame(jpeg, frame_id, timestamp_ms, width, height)
+    return 'video_frame', {
+        'image': base64.b64encode(jpeg).decode('utf-8'),
+        'frame_id': frame_id,
+        'timestamp': timestamp_ms,
+        'width': width,
+        'height': height
+    }
+
+
+class StreamClient(object):
+    def __init__(self, sid, transport, tier, controller=None):
+        self.sid = sid
+        self.transport = transport
+        self.tier = tier
+        self.controller = controller
+
+    def encode_key(self):
+        """(quality, scale) this client wants for the current frame"""
+        if self.controller is not None:
+            level = self.controller.level
+            return level.quality, level.scale
+        return tier_encode_key(self.tier)
+
+
+class FrameBroadcaster(object):
+    """
+    send frames to streaming clients as binary attachments or legacy base64 JSON
+
+    every client subscribes to a tier (full/medium/low). clients that acknowledge frames
+    get an AdaptiveStreamController which picks the JPEG quality, output scale and rate
+    within their tier. each distinct (quality, scale) is encoded once per frame on the
+    encoder pool, so extra viewers on the same tier cost almost nothing
+    """
+
+    def __init__(self, socketio, namespace='/', target_latency=0.2, max_in_flight=2, encoder_workers=2, metrics=None):
+        self.socketio = socketio
+        self.namespace = namespace
+        self.target_latency = target_latency
+        self.max_in_flight = max_in_flight
+        self.metrics = metrics
+        self.encoder = TieredEncoder(max_workers=encoder_workers, metrics=metrics)
+        self.clients = {}
+        self._lock = threading.Lock()
+
+    def add_client(self, sid, transport=None, ack=False, tier=None):
+        if transport not in TRANSPORTS:
+            transport = TRANSPORT_BASE64
+        if tier not in STREAM_TIERS:
+            tier = DEFAULT_TIER
+        controller = None
+        if ack:
+            best_level = STREAM_TIERS[tier]
+            controller = AdaptiveStreamController(target_latency=self.target_latency, max_in_flight=self.max_in_flight,
+                                                  start_level=best_level + 1, best_level=best_level)
+        with self._lock:
+            self.clients[sid] = StreamClient(sid, transport, tier, controller)
+        return transport, tier
+
+    def subscribe(self, sid, tier):
+        """move a client to another tier"""
+        client = self.clients.get(sid)
+        if client is None or tier not in STREAM_TIERS:
+            return False
+        client.tier = tier
+        if client.controller is not None:
+            client.controller.set_best_level(STREAM_TIERS[tier])
+        return True
+
+    def remove_client(self, sid):
+        with self._lock:
+            self.clients.pop(sid, None)
+
+    def has_clients(self):
+        """true if anyone (Socket.IO client or MJPEG viewer) is watching"""
+        return bool(self.clients) or self.encoder.viewers > 0
+
+    def ack(self, sid, frame_id):
+        client = self.clients.get(sid)
+        if client is None or client.controller is None:
+            return None
+        return client.controller.on_ack(frame_id)
+
+    def broadcast(self, image, frame_id, timestamp_ms):
+        """emit one frame to every client that is ready for it"""
+        self.broadcast_cache(self.encoder.new_frame(image, frame_id, timestamp_ms))
+
+    def broadcast_cache(self, cache):
+        """emit an already created FrameEncodeCache; encodings it already holds are reused"""
+        with self._lock:
+            clients = list(self.clients.values())
+
+        now = time.monotonic()
+        frame_id, timestamp_ms = cache.frame_id, cache.timestamp_ms
+
+        # start all needed encodings in parallel before waiting on any of them
+        recipients = []
+        for client in clients:
+            if client.controller is not None and not client.controller.should_send(now):
+                continue
+            key = client.encode_key()
+            cache.request(*key)
+            recipients.append((client, key))
+
+        payloads = {}
+        for client, key in recipients:
+            payload_key = (client.transport,) + key
+            if payload_key not in payloads:
+                encoded = cache.get(*key)
+                with timed(self.metrics, 'base64' if client.transport == TRANSPORT_BASE64 else 'pack'):
+                    payloads[payload_key] = (len(encoded.jpeg), build_payload(
+                        client.transport, encoded.jpeg, frame_id, timestamp_ms, encoded.width, encoded.height))
+            nbytes, (event, payload) = payloads[payload_key]
+
+            with timed(self.metrics, 'emit'):
+                self.socketio.emit(event, payload, to=client.sid, namespace=self.namespace)
+            if client.controller is not None:
+                client.controller.on_sent(frame_id, nbytes, now)
+
+    def stats(self):
+        with self._lock:
+            clients = list(self.clients.values())
+        return {
+            client.sid: dict(
+                transport=client.transport,
+                tier=client.tier,
+                adaptive=client.controller is not None,
+                **(client.controller.stats() if client.controller is not None else {})
+            )
+            for client in clients
+        }
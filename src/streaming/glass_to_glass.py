@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import deque
+
+
+def percentile(values, q):
+    """q-th percentile (0..1) of a list of numbers, nearest rank"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ClockOffsetEstimator(object):
+    """
+    estimate client clock - server clock from ping/pong round trips
+
+    offset = client_time - (server_send + server_receive) / 2, as in NTP. only the
+    samples with the shortest round trip are trusted since their midpoint guess is
+    the tightest; the estimate is the offset of the best recent sample
+    """
+
+    def __init__(self, window=16):
+        self.samples = deque(maxlen=window)
+
+    def add(self, server_send_ms, client_ms, server_receive_ms):
+        rtt = server_receive_ms - server_send_ms
+        if rtt < 0:
+            return None
+        offset = client_ms - (server_send_ms + server_receive_ms) / 2.0
+        self.samples.append((rtt, offset))
+        return offset
+
+    @property
+    def offset(self):
+        if not self.samples:
+            return None
+        return min(self.samples)[1]
+
+    @property
+    def rtt(self):
+        if not self.samples:
+            return None
+        return min(self.samples)[0]
+
+
+class ClientLatency(object):
+    def __init__(self, window, clock_window):
+        self.clock = ClockOffsetEstimator(clock_window)
+        self.latencies = deque(maxlen=window)
+        self.last_ping = None
+        # keep-alive re-sends of a static frame carry its original capture time; only the first render counts
+        self.last_measured_frame = None
+
+    def stats(self):
+        latencies = list(self.latencies)
+        rtt = self.clock.rtt
+        offset = self.clock.offset
+        return {
+            'samples': len(latencies),
+            'p50_ms': percentile(latencies, 0.5),
+            'p95_ms': percentile(latencies, 0.95),
+            'max_ms': max(latencies) if latencies else None,
+            'clock_offset_ms': round(offset, 1) if offset is not None else None,
+            'rtt_ms': round(rtt, 1) if rtt is not None else None
+        }
+
+
+class GlassToGlassTracker(object):
+    """
+    rolling camera-to-screen latency per client
+
+    every frame carries its capture timestamp (epoch ms on the server clock); the
+    client acknowledges the wall-clock time it painted the frame, and the difference,
+    corrected by the estimated client clock offset, is the glass-to-glass latency.
+    clock pings ride on the ack traffic: ping_due() says when a client needs a new one
+    """
+
+    def __init__(self, window=120, clock_window=16, ping_interval=5.0, metrics=None):
+        self.window = window
+        self.clock_window = clock_window
+        self.ping_interval = ping_interval
+        self.metrics = metrics
+        self.clients = {}
+        self._lock = threading.Lock()
+
+    def _client(self, sid):
+        client = self.clients.get(sid)
+        if client is None:
+            with self._lock:
+                client = self.clients.setdefault(sid, ClientLatency(self.window, self.clock_window))
+        return client
+
+    def ping_due(self, sid, now=None):
+        """return a clock_ping payload if sid has not been pinged for ping_interval, else None"""
+        now = time.monotonic() if now is None else now
+        client = self._client(sid)
+        # ping quickly until a few offset samples exist, then every ping_interval
+        interval = self.ping_interval if len(client.clock.samples) >= 4 else 0.5
+        if client.last_ping is not None and now - client.last_ping < interval:
+            return None
+        client.last_ping = now
+        return {'server_ms': time.time() * 1000.0}
+
+    def on_pong(self, sid, server_send_ms, client_ms):
+        return self._client(sid).clock.add(server_send_ms, client_ms, time.time() * 1000.0)
+
+    def on_render(self, sid, capture_ms, rendered_ms, frame_id=None):
+        """
+        record a rendered frame; returns its glass-to-glass latency in ms, or None without a
+        clock estimate or when frame_id was already measured (a keep-alive re-send)
+        """
+        client = self._client(sid)
+        if frame_id is not None:
+            if frame_id == client.last_measured_frame:
+                return None
+            client.last_measured_frame = frame_id
+        offset = client.clock.offset
+        if offset is None:
+            return None
+        latency = (rendered_ms - offset) - capture_ms
+        if latency < 0:
+            return None
+        client.latencies.append(round(latency, 1))
+        if self.metrics is not None:
+            self.metrics.observe('glass_to_glass', latency / 1000.0)
+        return latency
+
+    def remove_client(self, sid):
+        with self._lock:
+            self.clients.pop(sid, None)
+
+    def stats(self):
+        with self._lock:
+            clients = list(self.clients.items())
+        return {sid: client.stats() for sid, client in clients}
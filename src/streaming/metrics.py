@@ -0,0 +1,152 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# latency bucket upper bounds in seconds: 10 us to ~2.3 s, 30% apart
+LATENCY_BUCKETS = tuple(0.00001 * 1.3 ** i for i in range(48))
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class LatencyHistogram(object):
+    """
+    fixed-memory latency histogram
+
+    observations only increment a bucket count, so memory does not grow with the
+    number of frames; quantiles are estimated by interpolating inside the bucket
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.count, self.sum
+
+    def quantile(self, q, snapshot=None):
+        counts, count, _ = snapshot or self.snapshot()
+        if count == 0:
+            return None
+        rank = q * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else lower
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+
+class MetricsRegistry(object):
+    """
+    per-stage latency histograms, counters and gauges, rendered in the Prometheus text format
+
+    latencies are measured with time.perf_counter() around the hot-path stages
+    (capture, zoom, hands.process, classifiers, drawing, imencode, base64, emit)
+    """
+
+    def __init__(self, prefix='tomato'):
+        self.prefix = prefix
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, LatencyHistogram())
+        return histogram
+
+    def observe(self, stage, seconds):
+        self.histogram(stage).observe(seconds)
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def inc(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name, fn):
+        """register fn() to be read for gauge name every time the metrics are rendered"""
+        self.gauges[name] = fn
+
+    def summary(self):
+        """{stage: {count, p50, p95, p99}} in milliseconds"""
+        summary = {}
+        for stage, histogram in list(self.histograms.items()):
+            snapshot = histogram.snapshot()
+            summary[stage] = {'count': snapshot[1]}
+            for q in QUANTILES:
+                value = histogram.quantile(q, snapshot)
+                summary[stage][f'p{int(q * 100)}'] = round(value * 1000.0, 2) if value is not None else None
+        return summary
+
+    def render(self):
+        """Prometheus text exposition format"""
+        name = f'{self.prefix}_stage_latency_seconds'
+        lines = [f'# HELP {name} Time spent in each processing stage.', f'# TYPE {name} histogram']
+        quantile_lines = []
+        for stage, histogram in sorted(self.histograms.items()):
+            counts, count, total = histogram.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+            for q in QUANTILES:
+                value = histogram.quantile(q, (counts, count, total))
+                if value is not None:
+                    quantile_lines.append(f'{self.prefix}_stage_latency_quantile_seconds{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+
+        if quantile_lines:
+            lines.append(f'# HELP {self.prefix}_stage_latency_quantile_seconds Estimated latency quantiles per stage.')
+            lines.append(f'# TYPE {self.prefix}_stage_latency_quantile_seconds gauge')
+            lines.extend(quantile_lines)
+
+        with self._lock:
+            counters = sorted(self.counters.items())
+        for counter, value in counters:
+            lines.append(f'# TYPE {self.prefix}_{counter}_total counter')
+            lines.append(f'{self.prefix}_{counter}_total {value}')
+
+        for gauge, fn in sorted(self.gauges.items()):
+            try:
+                value = fn()
+            except Exception:
+                continue
+            if value is None:
+                continue
+            lines.append(f'# TYPE {self.prefix}_{gauge} gauge')
+            lines.append(f'{self.prefix}_{gauge} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def timed(metrics, stage):
+    """metrics.time(stage), or a no-op when metrics is None"""
+    if metrics is None:
+        return nullcontext()
+    return metrics.time(stage)
@@ -0,0 +1,35 @@
+from src.streaming.frame_transport import tier_encode_key
+
+MJPEG_BOUNDARY = 'frame'
+MJPEG_MIMETYPE = f'multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}'
+
+
+def mjpeg_stream(encoder, tier=None, keepalive_interval=1.0):
+    """
+    yield multipart JPEG parts straight from the encoder's per-frame cache
+
+    the (quality, scale) of the tier is requested from the same FrameEncodeCache the
+    Socket.IO clients use, so a frame already encoded for them is not encoded again
+    """
+    quality, scale = tier_encode_key(tier)
+    boundary = f'--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\n'.encode()
+
+    encoder.add_viewer()
+    try:
+        last = None
+        while True:
+            # on timeout the same frame comes back and is re-sent as a keep-alive
+            cache = encoder.wait_for_frame(last, timeout=keepalive_interval)
+            if cache is None:
+                continue
+            last = cache
+
+            encoded = cache.get(quality, scale)
+            yield b''.join((
+                boundary,
+                f'Content-Length: {len(encoded.jpeg)}\r\n\r\n'.encode(),
+                memoryview(encoded.jpeg),
+                b'\r\n'
+            ))
+    finally:
+        encoder.remove_viewer()
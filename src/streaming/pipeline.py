@@ -0,0 +1,143 @@
+import queue
+import threading
+import time
+
+# returned by a pipeline source to end the stream
+PIPELINE_END = object()
+
+
+class PipelineStage(object):
+    """one worker thread: take an item from the input queue, run fn, pass the result on (None drops it)"""
+
+    def __init__(self, name, fn):
+        self.name = name
+        self.fn = fn
+        self.input = None
+        self.output = None
+        self._thread = None
+
+        self.processed = 0
+        self.dropped = 0
+        self.busy_time = 0.0
+
+    def stats(self):
+        return {
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'queued': self.input.qsize() if self.input is not None else 0,
+            'avg_ms': round(self.busy_time / self.processed * 1000.0, 2) if self.processed else None
+        }
+
+
+class Pipeline(object):
+    """
+    run a frame source and a chain of stages on separate threads connected by bounded queues
+
+    the first queue drops its oldest item when full so the pipeline always works on the
+    freshest frame; later queues block, which pushes back on the slower stages. with one
+    worker per stage items stay in order, and since OpenCV and TFLite release the GIL the
+    stages overlap and throughput approaches that of the slowest stage
+    """
+
+    def __init__(self, source, stages, queue_size=2):
+        self.source = source
+        self.stages = [PipelineStage(name, fn) for name, fn in stages]
+        self.queue_size = queue_size
+
+        self._running = False
+        self._threads = []
+        self._finished = threading.Event()
+        self.source_dropped = 0
+
+        for index, stage in enumerate(self.stages):
+            stage.input = queue.Queue(maxsize=1 if index == 0 else queue_size)
+        for stage, next_stage in zip(self.stages, self.stages[1:]):
+            stage.output = next_stage.input
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        self._running = True
+        self._finished.clear()
+        self._threads = [threading.Thread(target=self._run_source, name='pipeline-source', daemon=True)]
+        self._threads += [
+            threading.Thread(target=self._run_stage, args=(stage,), name=f'pipeline-{stage.name}', daemon=True)
+            for stage in self.stages
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self._finished.set()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=1.0)
+        self._threads = []
+
+    def wait(self, timeout=None):
+        """block until the source ends or stop() is called"""
+        return self._finished.wait(timeout)
+
+    def _put_latest(self, q, item):
+        while True:
+            try:
+                q.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                    self.source_dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _put(self, q, item):
+        while self._running:
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run_source(self):
+        first = self.stages[0].input
+        while self._running:
+            item = self.source()
+            if item is PIPELINE_END:
+                break
+            if item is not None:
+                self._put_latest(first, item)
+        self._running = False
+        self._finished.set()
+
+    def _run_stage(self, stage):
+        while self._running:
+            try:
+                item = stage.input.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            start = time.perf_counter()
+            try:
+                result = stage.fn(item)
+            except Exception as e:
+                print(f"[ERROR] Pipeline stage '{stage.name}' failed: {e}")
+                result = None
+            stage.busy_time += time.perf_counter() - start
+            stage.processed += 1
+
+            if stage.output is None:
+                continue
+            if result is None:
+                stage.dropped += 1
+                continue
+            self._put(stage.output, result)
+
+    def stats(self):
+        stats = {stage.name: stage.stats() for stage in self.stages}
+        stats['source_dropped'] = self.source_dropped
+        return stats
@@ -0,0 +1,52 @@
+import time
+
+
+class StaticFrameEmitter(object):
+    """
+    hold the encoded frame for a static stream state (completion message, paused)
+    and re-send it only at a low keep-alive rate instead of re-encoding every loop
+    """
+
+    def __init__(self, broadcaster, keepalive_interval=1.0):
+        self.broadcaster = broadcaster
+        self.keepalive_interval = keepalive_interval
+
+        self.state = None
+        self._cache = None
+        self._last_sent = None
+
+    def show(self, state, image, frame_id, timestamp_ms):
+        """enter state with image as its frame; emits right away on entry, keep-alive afterwards"""
+        if state == self.state and self._cache is not None:
+            return self.keepalive()
+
+        self.state = state
+        self._cache = self.broadcaster.encoder.new_frame(image, frame_id, timestamp_ms)
+        self._emit(time.monotonic())
+        return True
+
+    def keepalive(self, now=None):
+        """re-send the cached frame if the keep-alive interval has passed"""
+        if self._cache is None:
+            return False
+        now = time.monotonic() if now is None else now
+        if now - self._last_sent < self.keepalive_interval:
+            return False
+        self._emit(now)
+        return True
+
+    def time_until_keepalive(self, now=None):
+        if self._cache is None:
+            return self.keepalive_interval
+        now = time.monotonic() if now is None else now
+        return max(0.0, self._last_sent + self.keepalive_interval - now)
+
+    def clear(self):
+        self.state = None
+        self._cache = None
+        self._last_sent = None
+
+    def _emit(self, now):
+        self._last_sent = now
+        if self.broadcaster.has_clients():
+            self.broadcaster.broadcast_cache(self._cache)
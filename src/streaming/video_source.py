@@ -0,0 +1,166 @@
+import os
+import time
+
+import cv2 as cv
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class VideoSource(object):
+    """base class for frame sources, follows the cv2.VideoCapture read/isOpened/release interface"""
+
+    def __init__(self, fps=30.0, realtime=True, loop=False):
+        self.fps = fps
+        self.realtime = realtime
+        self.loop = loop
+
+        self._replay_start = None
+        self._opened = True
+
+    def read(self):
+        raise NotImplementedError
+
+    def isOpened(self):
+        return self._opened
+
+    def release(self):
+        self._opened = False
+
+    def _restart_clock(self):
+        self._replay_start = None
+
+    def _pace(self, frame_time):
+        """sleep until frame_time (seconds since the first frame) when replaying at recorded timing"""
+        if not self.realtime:
+            return
+        now = time.monotonic()
+        if self._replay_start is None:
+            self._replay_start = now - frame_time
+            return
+        delay = self._replay_start + frame_time - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class CameraSource(VideoSource):
+    """live camera, timing is driven by the device"""
+
+    def __init__(self, index=0, width=None, height=None):
+        super().__init__(realtime=False)
+        self.cap = cv.VideoCapture(index)
+        if width is not None:
+            self.cap.set(cv.CAP_PROP_FRAME_WIDTH, width)
+        if height is not None:
+            self.cap.set(cv.CAP_PROP_FRAME_HEIGHT, height)
+        self.fps = self.cap.get(cv.CAP_PROP_FPS) or 30.0
+
+    def read(self):
+        return self.cap.read()
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+
+class VideoFileSource(VideoSource):
+    """recorded video file, replayed at its own timestamps or as fast as possible"""
+
+    def __init__(self, path, realtime=True, loop=False):
+        self.path = path
+        self.cap = cv.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise FileNotFoundError(f"Video file could not be opened: {path}")
+        super().__init__(fps=self.cap.get(cv.CAP_PROP_FPS) or 30.0, realtime=realtime, loop=loop)
+        self._index = 0
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if not ret and self.loop and self._index > 0:
+            self.cap.set(cv.CAP_PROP_POS_FRAMES, 0)
+            self._index = 0
+            self._restart_clock()
+            ret, frame = self.cap.read()
+        if not ret:
+            return False, None
+
+        pos_msec = self.cap.get(cv.CAP_PROP_POS_MSEC)
+        frame_time = pos_msec / 1000.0 if pos_msec > 0 else self._index / self.fps
+        self._index += 1
+        self._pace(frame_time)
+        return True, frame
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageDirectorySource(VideoSource):
+    """directory of still images replayed in file name order at a fixed fps"""
+
+    def __init__(self, path, fps=30.0, realtime=True, loop=False):
+        super().__init__(fps=fps, realtime=realtime, loop=loop)
+        self.path = path
+        self.files = sorted(
+            os.path.join(path, f) for f in os.listdir(path)
+            if f.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if not self.files:
+            raise FileNotFoundError(f"No images found in: {path}")
+        self._index = 0
+
+    def read(self):
+        if self._index >= len(self.files):
+            if not self.loop:
+                return False, None
+            self._index = 0
+            self._restart_clock()
+
+        frame = cv.imread(self.files[self._index])
+        if frame is None:
+            return False, None
+
+        self._pace(self._index / self.fps)
+        self._index += 1
+        return True, frame
+
+
+class ArraySource(VideoSource):
+    """in-memory frames (e.g. a recorded session loaded with numpy), optionally with capture timestamps"""
+
+    def __init__(self, frames, timestamps=None, fps=30.0, realtime=False, loop=False):
+        super().__init__(fps=fps, realtime=realtime, loop=loop)
+        self.frames = frames
+        self.timestamps = timestamps
+        if timestamps is not None and len(timestamps) != len(frames):
+            raise ValueError("timestamps must have the same length as frames")
+        self._index = 0
+
+    def read(self):
+        if self._index >= len(self.frames):
+            if not self.loop or len(self.frames) == 0:
+                return False, None
+            self._index = 0
+            self._restart_clock()
+
+        if self.timestamps is not None:
+            frame_time = self.timestamps[self._index] - self.timestamps[0]
+        else:
+            frame_time = self._index / self.fps
+
+        self._pace(frame_time)
+        frame = self.frames[self._index]
+        self._index += 1
+        return True, frame.copy()
+
+
+def open_video_source(spec, realtime=True, loop=False, fps=30.0):
+    """create a video source from a camera index, video file path or image directory"""
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        return CameraSource(int(spec))
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, fps=fps, realtime=realtime, loop=loop)
+    return VideoFileSource(spec, realtime=realtime, loop=loop)
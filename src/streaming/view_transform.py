@@ -0,0 +1,136 @@
+import json
+import os
+import threading
+
+import cv2 as cv
+import numpy as np
+
+
+def load_calibration(path):
+    """load camera_matrix / dist_coeffs (and the image_size they were measured at) from a JSON file"""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    camera_matrix = np.array(data["camera_matrix"], dtype=np.float64).reshape(3, 3)
+    dist_coeffs = np.array(data["dist_coeffs"], dtype=np.float64).reshape(-1)
+    image_size = tuple(data["image_size"]) if data.get("image_size") else None
+    return camera_matrix, dist_coeffs, image_size
+
+
+class ViewTransform(object):
+    """
+    digital zoom and lens undistortion applied to the camera frame in one cv2.remap pass
+
+    the remap tables are built once and only rebuilt when the zoom scale, the
+    calibration or the frame size change
+    """
+
+    def __init__(self, camera_matrix=None, dist_coeffs=None, image_size=None):
+        self.camera_matrix = None
+        self.dist_coeffs = None
+        self.image_size = None
+        self._lock = threading.Lock()
+        self.set_calibration(camera_matrix, dist_coeffs, image_size)
+
+    @classmethod
+    def from_file(cls, path):
+        """create a transform from a calibration file, or a zoom-only transform if the file does not exist"""
+        if path is None or not os.path.exists(path):
+            return cls()
+        camera_matrix, dist_coeffs, image_size = load_calibration(path)
+        print(f"[INFO] Loaded camera calibration: {path}")
+        return cls(camera_matrix, dist_coeffs, image_size)
+
+    @property
+    def calibrated(self):
+        return self.camera_matrix is not None
+
+    def set_calibration(self, camera_matrix, dist_coeffs=None, image_size=None):
+        if camera_matrix is not None and dist_coeffs is None:
+            dist_coeffs = np.zeros(5)
+        with self._lock:
+            self.camera_matrix = camera_matrix
+            self.dist_coeffs = dist_coeffs
+            self.image_size = image_size
+
+            self._maps = None
+            self._key = None
+            self._src_matrix = None
+            self._dst_matrix = None
+
+    def _scaled_camera_matrix(self, width, height):
+        camera_matrix = self.camera_matrix.copy()
+        if self.image_size is not None and tuple(self.image_size) != (width, height):
+            camera_matrix[0] *= width / self.image_size[0]
+            camera_matrix[1] *= height / self.image_size[1]
+        return camera_matrix
+
+    def _build(self, width, height, zoom_scale):
+        # zoom about the image center, the same crop-and-resize the app used to do
+        cx, cy = width / 2.0, height / 2.0
+        zoom = np.array([
+            [zoom_scale, 0.0, cx * (1.0 - zoom_scale)],
+            [0.0, zoom_scale, cy * (1.0 - zoom_scale)],
+            [0.0, 0.0, 1.0]
+        ])
+
+        if self.calibrated:
+            src_matrix = self._scaled_camera_matrix(width, height)
+            new_matrix, _ = cv.getOptimalNewCameraMatrix(src_matrix, self.dist_coeffs, (width, height), 0)
+            dist_coeffs = self.dist_coeffs
+        else:
+            src_matrix = np.eye(3)
+            new_matrix = np.eye(3)
+            dist_coeffs = np.zeros(5)
+
+        self._src_matrix = src_matrix
+        self._dst_matrix = zoom @ new_matrix
+        self._maps = cv.initUndistortRectifyMap(src_matrix, dist_coeffs, None, self._dst_matrix,
+                                                (width, height), cv.CV_16SC2)
+        self._key = (width, height, zoom_scale)
+
+    def _ensure(self, width, height, zoom_scale):
+        """build the tables if needed and return (maps, src_matrix, dst_matrix) consistent with each other"""
+        with self._lock:
+            if self._key != (width, height, zoom_scale):
+                self._build(width, height, zoom_scale)
+            return self._maps, self._src_matrix, self._dst_matrix
+
+    def is_identity(self, zoom_scale):
+        return zoom_scale == 1.0 and not self.calibrated
+
+    def apply(self, frame, zoom_scale=1.0):
+        """undistort and zoom frame, keeping its size"""
+        if self.is_identity(zoom_scale):
+            return frame
+        height, width = frame.shape[:2]
+        maps, _, _ = self._ensure(width, height, zoom_scale)
+        return cv.remap(frame, maps[0], maps[1], cv.INTER_LINEAR)
+
+    def display_to_camera(self, point, frame_size, zoom_scale=1.0):
+        """map a point in the transformed (displayed) frame back to raw camera pixel coordinates"""
+        if self.is_identity(zoom_scale):
+            return [int(point[0]), int(point[1])]
+        _, src_matrix, dst_matrix = self._ensure(frame_size[0], frame_size[1], zoom_scale)
+
+        ray = np.linalg.inv(dst_matrix) @ np.array([point[0], point[1], 1.0])
+        if not self.calibrated:
+            return [int(round(ray[0] / ray[2])), int(round(ray[1] / ray[2]))]
+
+        object_point = np.array([[ray[0] / ray[2], ray[1] / ray[2], 1.0]])
+        image_points, _ = cv.projectPoints(object_point, np.zeros(3), np.zeros(3), src_matrix, self.dist_coeffs)
+        x, y = image_points.reshape(2)
+        return [int(round(x)), int(round(y))]
+
+    def camera_to_display(self, point, frame_size, zoom_scale=1.0):
+        """map a raw camera pixel to its position in the transformed (displayed) frame"""
+        if self.is_identity(zoom_scale):
+            return [int(point[0]), int(point[1])]
+        _, src_matrix, dst_matrix = self._ensure(frame_size[0], frame_size[1], zoom_scale)
+
+        if not self.calibrated:
+            x, y, w = dst_matrix @ np.array([point[0], point[1], 1.0])
+            return [int(round(x / w)), int(round(y / w))]
+
+        src = np.array([[[point[0], point[1]]]], dtype=np.float64)
+        x, y = cv.undistortPoints(src, src_matrix, self.dist_coeffs, P=dst_matrix).reshape(2)
+        return [int(round(x)), int(round(y))]